@@ -111,6 +111,7 @@ Perhaps exploring your surroundings will help you understand where you are.
 
 Type 'help' at any time to see available commands.
 """,
+    "description": "Explore a mysterious abandoned mansion",
     "author": "Your Name",
     "version": "0.1"
 }
\ No newline at end of file
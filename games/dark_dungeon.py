@@ -54,6 +54,16 @@ locations = {
         "items": ["lever"],
         "characters": ["ghost"],
         "first_visit": True
+    },
+    "courtyard": {
+        "name": "Castle Courtyard",
+        "description": "Cold night air and open sky. Behind you, the raised portcullis gapes over the dungeon entrance.",
+        "exits": {
+            "south": "entrance_hall"
+        },
+        "items": [],
+        "characters": [],
+        "first_visit": True
     }
 }
 
@@ -138,6 +148,23 @@ characters = {
     }
 }
 
+# What happens when the player acts on things
+triggers = [
+    {
+        "verb": "pull",
+        "item": "lever",
+        "properties": {"lever": {"pulled": False}},
+        "set_properties": {"lever": {"pulled": True}},
+        "exits": [["entrance_hall", "north", "courtyard"]],
+        "message": "You heave on the lever. With a shriek of rusted iron, the portcullis grinds upward."
+    },
+    {
+        "verb": "pull",
+        "item": "lever",
+        "message": "The lever is already pulled as far as it will go."
+    }
+]
+
 # Player starting state
 player = {
     "current_location": "start",
@@ -161,6 +188,7 @@ Can you find your way to freedom?
 
 Type 'help' at any time to see available commands.
 """,
+    "description": "Escape from a dangerous underground prison",
     "author": "Your Name",
     "version": "0.1"
 }
\ No newline at end of file
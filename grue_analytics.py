@@ -0,0 +1,295 @@
+# Grue Text Adventure Engine - Gameplay Analytics
+#
+# Answers questions about how a game is played from the columnar command
+# logs grue_log writes: which rooms players visit, which ways they go,
+# which items they pick up, where they give up, and how many get from one
+# room to another:
+#
+#     python grue_analytics.py logs/dark_dungeon --funnel start,entrance_hall
+#
+# Every figure is computed with whole-array NumPy operations over the
+# memory-mapped columns, so millions of sessions take seconds, not the
+# hours a Python loop over each event would. This module needs NumPy; the
+# engine and its logging do not.
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from grue_log import COLUMNS, CommandLog
+from grue_registry import GameRegistry
+from grue_world import load_world
+
+REGISTRY = GameRegistry()
+
+# Largest world transition_matrix() builds a dense matrix for
+DENSE_LIMIT = 4096
+
+# Rows printed for each ranking in the report
+DEFAULT_TOP = 10
+
+_NEVER = np.iinfo(np.int64).max
+
+
+class Log:
+    """A command log opened for analysis, with one memory-mapped array per column.
+
+    Rows are in the order they were logged, so each session's rows are in
+    the order it ran its commands, interleaved with other sessions' rows.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, CommandLog.META), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.directory = directory
+        self.game = self.meta["game"]
+        self.sessions = self.meta["sessions"]
+        self.locations = self.meta["locations"]
+        self.items = self.meta["items"]
+        self.verbs = self.meta["verbs"]
+
+        order = "<" if self.meta["byteorder"] == "little" else ">"
+        dtypes = {name: np.dtype(order + self.meta["columns"][name]) for name, _ in COLUMNS}
+        paths = {name: os.path.join(directory, name) for name in dtypes}
+        sizes = [os.path.getsize(path) // dtypes[name].itemsize if os.path.exists(path) else 0
+                 for name, path in paths.items()]
+
+        # Rows that did not reach every column before a crash are left out
+        self.rows = min(sizes)
+        for name, dtype in dtypes.items():
+            if self.rows:
+                column = np.memmap(paths[name], dtype=dtype, mode="r", shape=(self.rows,))
+            else:
+                column = np.empty(0, dtype=dtype)
+            setattr(self, name, column)
+        self._first_rows = None
+        self._last_rows = None
+
+    def moved(self):
+        """Return a boolean array marking the rows where the player changed location."""
+        return self.source != self.destination
+
+    def first_rows(self):
+        """Return the index of each session's first row, in session order."""
+        if self._first_rows is None:
+            self._first_rows = np.unique(self.session, return_index=True)[1]
+        return self._first_rows
+
+    def last_rows(self):
+        """Return the index of each session's last row, in session order."""
+        if self._last_rows is None:
+            self._last_rows = self.rows - 1 - np.unique(self.session[::-1], return_index=True)[1]
+        return self._last_rows
+
+    def active_sessions(self):
+        """Return how many sessions ran at least one command."""
+        return len(self.first_rows())
+
+
+def verb_counts(log):
+    """Return {verb: number of commands} for every verb in the log."""
+    counts = np.bincount(log.verb, minlength=len(log.verbs))
+    return dict(zip(log.verbs, counts.tolist()))
+
+
+def visit_counts(log):
+    """Return how many times each location was entered, counting each session's start as a visit."""
+    moved = log.moved()
+    counts = np.bincount(log.destination[moved], minlength=log.locations)
+    counts += np.bincount(log.source[log.first_rows()], minlength=log.locations)
+    return counts
+
+
+def transitions(log):
+    """Return (sources, destinations, counts) of the moves players made, most used first.
+
+    Each pair is counted once per command, so a command that walks a whole
+    route (such as "go to") counts as one move between its two ends.
+    """
+    moved = log.moved()
+    keys = log.source[moved].astype(np.int64) * log.locations + log.destination[moved]
+    keys, counts = np.unique(keys, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    keys, counts = keys[order], counts[order]
+    return keys // log.locations, keys % log.locations, counts
+
+
+def transition_probabilities(log):
+    """Return transitions() with a fourth array: each move's share of all the moves out of its source."""
+    sources, destinations, counts = transitions(log)
+    totals = np.bincount(sources, weights=counts, minlength=log.locations)
+    return sources, destinations, counts, counts / totals[sources]
+
+
+def transition_matrix(log):
+    """Return the moves between every pair of locations as a dense matrix indexed [source, destination]."""
+    if log.locations > DENSE_LIMIT:
+        raise ValueError(f"{log.locations:,} locations is too many for a dense matrix; use transitions()")
+    matrix = np.zeros((log.locations, log.locations), dtype=np.int64)
+    sources, destinations, counts = transitions(log)
+    matrix[sources, destinations] = counts
+    return matrix
+
+
+def pickup_rates(log):
+    """Return the fraction of sessions that picked up each item at least once."""
+    taken = log.item >= 0
+    pairs = np.unique(log.session[taken].astype(np.int64) * log.items + log.item[taken])
+    return np.bincount(pairs % log.items, minlength=log.items) / max(1, log.active_sessions())
+
+
+def first_arrivals(log, location, after=None):
+    """Return, for each session, the row at which it first reached a location, or -1 if it never did.
+
+    Starting in the location counts as reaching it on the session's first
+    row. With after, an array of one row per session, only arrivals later
+    than each session's row count.
+    """
+    first = log.first_rows()
+    rows = np.union1d(np.flatnonzero(log.destination == location), first[log.source[first] == location])
+    if after is not None:
+        rows = rows[rows > after[log.session[rows]]]
+    arrivals = np.full(log.sessions, -1, dtype=np.int64)
+    sessions, index = np.unique(log.session[rows], return_index=True)
+    arrivals[sessions] = rows[index]
+    return arrivals
+
+
+def funnel(log, locations):
+    """Return how many sessions reached each location in turn, each after reaching the ones before it."""
+    after = np.full(log.sessions, -1, dtype=np.int64)
+    counts = []
+    for location in locations:
+        arrivals = first_arrivals(log, location, after)
+        reached = arrivals >= 0
+        counts.append(int(reached.sum()))
+        after = np.where(reached, arrivals, _NEVER)
+    return counts
+
+
+def path_lengths(log, target=None):
+    """Return the number of moves each session made, or with a target the moves it took to first get there.
+
+    Sessions that never reached the target are left out. np.bincount of
+    the result gives the distribution.
+    """
+    moved_rows = np.flatnonzero(log.moved())
+    if target is None:
+        return np.bincount(log.session[moved_rows], minlength=log.sessions)
+    arrivals = first_arrivals(log, target)
+    reached = arrivals >= 0
+    counted = moved_rows[moved_rows <= arrivals[log.session[moved_rows]]]
+    return np.bincount(log.session[counted], minlength=log.sessions)[reached]
+
+
+def drop_off(log):
+    """Return how many sessions ended in each location."""
+    return np.bincount(log.destination[log.last_rows()], minlength=log.locations)
+
+
+def session_durations(log):
+    """Return the seconds between the first and last command of each session that ran any."""
+    return (log.time[log.last_rows()] - log.time[log.first_rows()]) / 1e6
+
+
+def _ranked(counts, labels, top, total=None):
+    """Return report lines for the largest counts, with a share of total if given."""
+    lines = []
+    for index in np.argsort(-counts, kind="stable")[:top]:
+        if not counts[index]:
+            break
+        share = f" ({counts[index] / total:.1%})" if total else ""
+        lines.append(f"  {labels(index):<30} {int(counts[index]):>10,}{share}")
+    return lines
+
+
+def report(log, world=None, funnel_steps=(), top=DEFAULT_TOP):
+    """Return a printable summary of a log; world, if given, names its locations and items."""
+    def location_label(index):
+        return world.location_ids[index] if world is not None else f"location {index}"
+
+    def item_label(index):
+        return world.item_ids[index] if world is not None else f"item {index}"
+
+    active = log.active_sessions()
+    moves = path_lengths(log)
+    durations = session_durations(log)
+    rows = [
+        ("Sessions", f"{active:,}"),
+        ("Commands", f"{log.rows:,}"),
+        ("Moves", f"{int(moves.sum()):,}"),
+        ("Moves/session", f"{moves.sum() / max(1, active):,.1f}"),
+    ]
+    if len(durations):
+        rows.append(("Median length", f"{np.median(durations):,.1f}s"))
+    lines = [f"{label + ':':<15} {value}" for label, value in rows]
+
+    lines += ["", "Commands by verb:"]
+    verbs = np.bincount(log.verb, minlength=len(log.verbs))
+    lines += _ranked(verbs, log.verbs.__getitem__, top, log.rows)
+
+    lines += ["", "Most visited locations:"]
+    lines += _ranked(visit_counts(log), location_label, top)
+
+    lines += ["", "Most used ways between locations:"]
+    sources, destinations, counts, shares = transition_probabilities(log)
+    for source, destination, count, probability in list(zip(sources, destinations, counts, shares))[:top]:
+        way = f"{location_label(source)} -> {location_label(destination)}"
+        lines.append(f"  {way:<30} {int(count):>10,} ({probability:.1%} of moves out)")
+
+    lines += ["", "Items picked up (share of sessions):"]
+    rates = pickup_rates(log)
+    for index in np.argsort(-rates, kind="stable")[:top]:
+        if rates[index]:
+            lines.append(f"  {item_label(index):<30} {rates[index]:>10.1%}")
+
+    lines += ["", "Where sessions ended:"]
+    lines += _ranked(drop_off(log), location_label, top, active)
+
+    if funnel_steps:
+        lines += ["", "Funnel:"]
+        previous = None
+        for location, count in zip(funnel_steps, funnel(log, funnel_steps)):
+            lost = f", {previous - count:,} dropped" if previous is not None else ""
+            lines.append(f"  {location_label(location):<30} {count:>10,} ({count / max(1, active):.1%}{lost})")
+            previous = count
+        lengths = path_lengths(log, funnel_steps[-1])
+        if len(lengths):
+            lines.append(f"  {'Moves to reach the last step:':<30} median {np.median(lengths):,.0f}, "
+                         f"p90 {np.percentile(lengths, 90):,.0f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the columnar command logs of a Grue game.")
+    parser.add_argument("log", help="log directory written by grue_log (such as the server's --log DIR/<game>)")
+    parser.add_argument("--funnel", help="comma-separated location IDs to count sessions reaching in turn")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="rows per ranking (default: %(default)s)")
+    args = parser.parse_args()
+
+    log = Log(args.log)
+    world = None
+    if log.game and REGISTRY.get(log.game) is not None:
+        world = load_world(REGISTRY.load(log.game))
+        if world.fingerprint().hex() != log.meta["fingerprint"]:
+            print(f"warning: {log.game} has changed since the log was written; showing indexes", file=sys.stderr)
+            world = None
+
+    steps = []
+    for step in (args.funnel.split(",") if args.funnel else []):
+        if world is not None and step in world.location_index:
+            steps.append(world.location_index[step])
+        elif step.isdigit() and int(step) < log.locations:
+            steps.append(int(step))
+        else:
+            parser.error(f"unknown location '{step}'")
+
+    print(report(log, world, steps, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# Grue Text Adventure Engine - Scaling Benchmarks
+#
+# Times the core engine operations on generated worlds of increasing size
+# and appends the results to a JSON-lines file. Each run is compared with
+# the one before it, or with the latest run of a given git revision:
+#
+#     python grue_bench.py --sizes 10,1000,100000
+#     python grue_bench.py --against 3f8c008
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import grue_engine
+from grue_engine import GrueEngine
+from grue_worldgen import generate_game
+
+DEFAULT_SIZES = [10, 1000, 100000, 1000000]
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "results.jsonl")
+
+# Slowdown against the compared run that is reported as a regression
+REGRESSION_THRESHOLD = 1.2
+
+
+def _time_per_call(func, iterations, repeat=3):
+    """Return the best mean time of func over several rounds, in microseconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = (time.perf_counter() - started) / iterations
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+def _time_paired(do, undo, iterations, repeat=3):
+    """Time do() when each call must be reverted by an untimed undo(), in microseconds."""
+    best = None
+    clock = time.perf_counter
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(iterations):
+            started = clock()
+            do()
+            total += clock() - started
+            undo()
+        best = total / iterations if best is None else min(best, total / iterations)
+    return best * 1e6
+
+
+def benchmark_size(rooms, iterations=2000):
+    """Time every benchmarked operation on a generated world of the given size."""
+    module = generate_game(rooms=rooms, items_per_room=1, characters=max(1, rooms // 100))
+    gc.collect()
+
+    results = {}
+    started = time.perf_counter()
+    engine = GrueEngine()
+    engine.load_game(module)
+    results["load_game"] = (time.perf_counter() - started) * 1e6
+    results["load_game_cached"] = _time_per_call(lambda: GrueEngine().load_game(module), 200)
+
+    # The start room always holds an item, a character and an exit east
+    start = engine.player.current_location
+    item = engine.items[next(iter(engine.state.items_at(start)))]
+    character = engine.characters[engine.locations[start].characters[0]]
+    item_name = item.name.lower()
+    character_name = character.name.lower()
+    far_item_name = engine.items[-1].name.lower()
+
+    results["display_location"] = _time_per_call(engine.display_location, iterations)
+    results["move_player"] = _time_paired(lambda: engine.move_player("east"),
+                                          lambda: engine.move_player("west"), iterations)
+    results["take_item"] = _time_paired(lambda: engine.take_item(item_name),
+                                        lambda: engine.drop_item(item_name), iterations)
+    results["examine"] = _time_per_call(lambda: engine.examine(item_name), iterations)
+    results["talk_to"] = _time_per_call(lambda: engine.talk_to(character_name), iterations)
+    results["get_item_id_from_name"] = _time_per_call(
+        lambda: engine.get_item_id_from_name(far_item_name), iterations)
+    return results
+
+
+def git_revision():
+    """Return the current git revision, or None outside a git checkout."""
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def load_runs(path):
+    """Return every stored benchmark run, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(run, previous):
+    """Return (size, operation, old, new) for each operation that got noticeably slower."""
+    regressions = []
+    for size, operations in run["results"].items():
+        old_operations = previous["results"].get(size, {})
+        for operation, new in operations.items():
+            old = old_operations.get(operation)
+            if old and new > old * REGRESSION_THRESHOLD:
+                regressions.append((size, operation, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Grue engine on generated worlds.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated room counts (default: %(default)s)")
+    parser.add_argument("--iterations", type=int, default=2000, help="calls per timed operation (default: 2000)")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file to append results to")
+    parser.add_argument("--against", metavar="REVISION",
+                        help="compare with the latest run of this git revision (default: the previous run)")
+    args = parser.parse_args()
+
+    run = {
+        "engine_version": grue_engine.__version__,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "results": {},
+    }
+
+    for size in [int(size) for size in args.sizes.split(",")]:
+        print(f"{size:,} rooms")
+        results = benchmark_size(size, args.iterations)
+        for operation, micros in results.items():
+            print(f"  {operation:<24}{micros:>14,.2f} us")
+        run["results"][str(size)] = results
+
+    # Compare with the previous run, or the latest one of the requested revision
+    previous_runs = load_runs(args.results)
+    if args.against:
+        previous_runs = [r for r in previous_runs if (r.get("revision") or "").startswith(args.against)]
+        if not previous_runs:
+            print(f"\nNo stored run of revision {args.against} to compare with")
+    if previous_runs:
+        previous = previous_runs[-1]
+        regressions = find_regressions(run, previous)
+        print(f"\nCompared with the run of {previous['timestamp']} "
+              f"(revision {previous.get('revision') or 'unknown'}): {len(regressions) or 'no'} regression(s)")
+        for size, operation, old, new in regressions:
+            print(f"  {int(size):,} rooms {operation}: {old:,.2f} us -> {new:,.2f} us")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# Grue Text Adventure Engine - Command Table
+
+class Command:
+    """A verb the parser understands and the handler that carries it out.
+
+    Handlers are called as handler(engine, argument) and return the
+    response text. Commands registered with a fixed argument (such as
+    "n" meaning "go north") are passed that argument instead of whatever
+    followed the verb, and only match when nothing followed it. name is
+    the first verb phrase the command was registered under. A command
+    that takes the rest of the line (such as "say") gets everything after
+    its verb, including anything that would otherwise chain commands. A
+    command whose argument is optional also matches its verb on its own,
+    and is then called without an argument.
+    """
+
+    __slots__ = ('handler', 'takes_argument', 'argument', 'name', 'rest_of_line', 'optional')
+
+    def __init__(self, handler, takes_argument, argument=None, name=None, rest_of_line=False, optional=False):
+        self.handler = handler
+        self.takes_argument = takes_argument
+        self.argument = argument
+        self.name = name
+        self.rest_of_line = rest_of_line
+        self.optional = optional
+
+
+class CommandTable:
+    """Maps verb phrases and their aliases to commands.
+
+    Verbs may be several words long ("talk to", "look at"). Parsing tries
+    the longest registered phrase first, so dispatch costs at most one
+    dictionary lookup per word of the longest verb, however many verbs
+    are registered.
+    """
+
+    def __init__(self):
+        self.verbs = {}
+        self.max_words = 1
+        self.help_entries = []
+        self.help_footer = ""
+        self._help_text = None
+
+    def copy(self):
+        """Return an independent copy that can be extended without changing this table."""
+        table = CommandTable()
+        table.verbs = dict(self.verbs)
+        table.max_words = self.max_words
+        table.help_entries = list(self.help_entries)
+        table.help_footer = self.help_footer
+        return table
+
+    def register(self, verbs, handler, takes_argument=False, argument=None, usage=None, description=None,
+                 rest_of_line=False, optional=False):
+        """Register a handler under one or more verb phrases.
+
+        The first phrase is the command's name; the rest are aliases. If a
+        usage and description are given, the command is listed in the help.
+        With rest_of_line, the argument is never split into chained commands;
+        with optional, the verb also matches with nothing after it.
+        """
+        if isinstance(verbs, str):
+            verbs = [verbs]
+        verbs = [" ".join(verb.lower().split()) for verb in verbs]
+        command = Command(handler, takes_argument or rest_of_line or optional, argument, verbs[0], rest_of_line,
+                          optional)
+        for verb in verbs:
+            self.verbs[verb] = command
+            self.max_words = max(self.max_words, verb.count(" ") + 1)
+
+        if usage is not None:
+            self.help_entries.append((usage, description))
+            self._help_text = None
+
+    def lookup(self, text):
+        """Split a command line into its Command and argument.
+
+        Returns (command, argument), or (None, None) if no verb matches.
+        """
+        words = text.split()
+        for length in range(min(self.max_words, len(words)), 0, -1):
+            command = self.verbs.get(" ".join(words[:length]).lower())
+            if command is None:
+                continue
+
+            rest = " ".join(words[length:])
+            if command.takes_argument:
+                if rest:
+                    return command, rest
+                if command.optional:
+                    return command, None
+            elif not rest:
+                return command, command.argument
+            break
+
+        return None, None
+
+    def takes_rest_of_line(self, text):
+        """Return whether a command line starts with a verb that takes the rest of the line."""
+        command, _ = self.lookup(text)
+        return command is not None and command.rest_of_line
+
+    def help_text(self):
+        """Return the help listing, built once from the registered commands."""
+        if self._help_text is None:
+            lines = ["", "Available commands:"]
+            lines.extend(f"- {usage:<15}: {description}" for usage, description in self.help_entries)
+            if self.help_footer:
+                lines.append(self.help_footer)
+            self._help_text = "\n".join(lines) + "\n"
+        return self._help_text
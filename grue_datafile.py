@@ -0,0 +1,714 @@
+# Grue Text Adventure Engine - Data-File Worlds
+#
+# A world can be written as a JSON data file holding the same five tables
+# as a game module (locations, items, characters, player, game_info), and
+# optionally its triggers.
+# The first time a data file is loaded it is compiled into a binary cache
+# in a __grue_cache__ directory beside it, named after a hash of the
+# file's contents. Later loads memory-map that cache instead of parsing
+# JSON: records are decoded only when the engine asks for them, and every
+# process that maps the same cache shares its pages.
+#
+# Locations are grouped into regions of nearby rooms (by breadth-first
+# order over the exits) and stored region by region. A region is decoded
+# the first time a player enters it and dropped again when it is the
+# least recently used of the regions kept in memory. Nothing is lost on
+# eviction: records are read-only, and everything a session changes
+# lives in its own overlay (see grue_state).
+#
+# Descriptions and dialogue are kept compressed against a dictionary
+# trained on the world's own prose (see grue_text) and decoded only when
+# something reads them, so records decoded for a region cost little until
+# a player actually looks at them.
+#
+# The tables the travel command routes with (see grue_routing) are worked
+# out when the cache is compiled, so large worlds need no search to set up.
+#
+#     python grue_datafile.py games/my_world.json     # compile ahead of time
+
+import functools
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import types
+from array import array
+from collections import OrderedDict, deque
+
+from grue_npcs import Behaviour
+from grue_routing import ALL_PAIRS_LIMIT, Router
+from grue_text import Prose, TextStore, compress_texts, train_dictionary
+from grue_triggers import compile_triggers
+from grue_world import World, Location, Item, Character, RenderCache, _first_in_scope
+
+CACHE_DIR = "__grue_cache__"
+CACHE_MAGIC = b"GRUW"
+CACHE_VERSION = 7
+
+# Sections of a compiled cache, in file order
+SECTIONS = (
+    "meta", "string_offsets", "strings", "text_dictionary", "text_offsets", "texts",
+    "locations", "location_pool", "exits", "items", "characters", "object_pool",
+    "location_rows", "row_locations", "location_regions", "region_starts",
+    "location_order", "item_order", "character_order",
+    "item_exact", "item_words", "item_lower",
+    "character_exact", "character_words", "character_lower",
+    "location_exact", "location_words", "location_lower",
+    "entrance_offsets", "entrance_sources", "entrance_directions", "landmark_distances",
+)
+_HEADER = struct.Struct("<4sII")
+_SECTION = struct.Struct("<QQ")
+
+# Number of int32 fields in each fixed-size record
+LOCATION_FIELDS = 10
+ITEM_FIELDS = 8
+CHARACTER_FIELDS = 8
+
+# Decoded items and characters kept per world
+RECORD_CACHE_SIZE = 4096
+
+# Locations per region, and decoded regions kept per world
+REGION_SIZE = 256
+REGION_CACHE_SIZE = 64
+
+REQUIRED_TABLES = ("locations", "items", "characters", "player", "game_info")
+OPTIONAL_TABLES = ("triggers",)
+
+
+class _StringHeap:
+    """Collects the strings of a world, storing each distinct one once."""
+
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, text):
+        index = self.index.get(text)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(text)
+            self.index[text] = index
+        return index
+
+
+def _name_tables(heap, records):
+    """Return the exact-name, word and lowercase-name arrays for a NameIndex-style lookup."""
+    exact = []
+    words = []
+    lower = array('i')
+    for record in records:
+        name = record.name.lower()
+        lower.append(heap.add(name))
+        for key in {name, record.id.lower()}:
+            exact.append((key, record.index))
+        for word in set(name.split()):
+            words.append((word, record.index))
+
+    def flatten(pairs):
+        flat = array('i')
+        for key, index in sorted(pairs):
+            flat.extend((heap.add(key), index))
+        return flat
+
+    return flatten(exact), flatten(words), lower
+
+
+def locality_order(world):
+    """Return every location index in breadth-first order over the exits, starting from the start.
+
+    Rooms that are close together in the world end up close together in the
+    order; rooms unreachable from the start follow, each group in its own
+    breadth-first order.
+    """
+    count = len(world.locations)
+    seen = bytearray(count)
+    order = []
+    for root in [world.start_location] + list(range(count)):
+        if seen[root]:
+            continue
+        seen[root] = 1
+        queue = deque([root])
+        while queue:
+            index = queue.popleft()
+            order.append(index)
+            for direction in world.locations[index].exits:
+                target = world.exits[direction][index]
+                if not seen[target]:
+                    seen[target] = 1
+                    queue.append(target)
+    return order
+
+
+def write_cache(world, path):
+    """Write a compiled World to a binary cache file."""
+    heap = _StringHeap()
+    prose = _StringHeap()
+
+    # Store location records region by region, in locality order
+    row_locations = array('i', locality_order(world))
+    location_rows = array('i', [0]) * len(row_locations)
+    location_regions = array('i', [0]) * len(row_locations)
+    for row, index in enumerate(row_locations):
+        location_rows[index] = row
+        location_regions[index] = row // REGION_SIZE
+    region_starts = array('i', range(0, len(row_locations), REGION_SIZE))
+    region_starts.append(len(row_locations))
+
+    locations = array('i')
+    location_pool = array('i')
+    for location in (world.locations[index] for index in row_locations):
+        row = [heap.add(location.id), heap.add(location.name), prose.add(location.description),
+               int(location.first_visit)]
+        for values in (location.exits, location.items, location.characters):
+            row.extend((len(location_pool), len(values)))
+            location_pool.extend(values)
+        locations.extend(row)
+
+    exits = array('i')
+    for targets in world.exits:
+        exits.extend(targets)
+
+    object_pool = array('i')
+    items = array('i')
+    for item in world.items:
+        items.extend((heap.add(item.id), heap.add(item.name), prose.add(item.description),
+                      int(item.portable), int(item.visible), len(object_pool), len(item.actions),
+                      heap.add(json.dumps(item.properties))))
+        object_pool.extend(heap.add(action) for action in item.actions)
+
+    characters = array('i')
+    for char in world.characters:
+        characters.extend((heap.add(char.id), heap.add(char.name), prose.add(char.description),
+                           int(char.friendly), prose.add(json.dumps(char.dialogue)),
+                           len(object_pool), len(char.inventory), heap.add(json.dumps(char.properties))))
+        object_pool.extend(char.inventory)
+
+    def order(ids):
+        return array('i', sorted(range(len(ids)), key=ids.__getitem__))
+
+    item_exact, item_words, item_lower = _name_tables(heap, world.items)
+    character_exact, character_words, character_lower = _name_tables(heap, world.characters)
+    location_exact, location_words, location_lower = _name_tables(heap, world.locations)
+
+    router = world.router()
+    entrance_offsets, entrance_sources, entrance_directions = router.reverse
+    landmarks = router.landmarks if len(world.locations) > ALL_PAIRS_LIMIT else []
+    landmark_distances = array('i')
+    for forward, backward in landmarks:
+        landmark_distances.extend(forward)
+        landmark_distances.extend(backward)
+
+    meta = {
+        "byteorder": sys.byteorder,
+        "fingerprint": world.fingerprint().hex(),
+        "counts": [len(world.locations), len(world.items), len(world.characters)],
+        "directions": world.directions,
+        "game_info": world.game_info,
+        "start_location": world.start_location,
+        "start_inventory": list(world.start_inventory),
+        "max_inventory": world.max_inventory,
+        "max_weight": world.max_weight,
+        "start_weight": world.start_weight,
+        "start_stats": world.start_stats,
+        "landmarks": len(landmarks),
+        "trigger_rules": world.trigger_rules,
+        "behaviours": [behaviour.to_list() for behaviour in world.behaviours.values()],
+    }
+
+    # Every string has been added to the heap by now, so it can be laid out
+    encoded = [text.encode("utf-8") for text in heap.strings]
+    string_offsets = array('q', [0])
+    total = 0
+    for raw in encoded:
+        total += len(raw)
+        string_offsets.append(total)
+
+    dictionary = train_dictionary(prose.strings)
+    text_offsets, texts = compress_texts(prose.strings, dictionary)
+
+    blobs = {
+        "meta": json.dumps(meta).encode("utf-8"),
+        "string_offsets": string_offsets.tobytes(),
+        "strings": b"".join(encoded),
+        "text_dictionary": dictionary,
+        "text_offsets": text_offsets.tobytes(),
+        "texts": texts,
+        "locations": locations.tobytes(),
+        "location_pool": location_pool.tobytes(),
+        "exits": exits.tobytes(),
+        "items": items.tobytes(),
+        "characters": characters.tobytes(),
+        "object_pool": object_pool.tobytes(),
+        "location_rows": location_rows.tobytes(),
+        "row_locations": row_locations.tobytes(),
+        "location_regions": location_regions.tobytes(),
+        "region_starts": region_starts.tobytes(),
+        "location_order": order(world.location_ids).tobytes(),
+        "item_order": order(world.item_ids).tobytes(),
+        "character_order": order(world.character_ids).tobytes(),
+        "item_exact": item_exact.tobytes(),
+        "item_words": item_words.tobytes(),
+        "item_lower": item_lower.tobytes(),
+        "character_exact": character_exact.tobytes(),
+        "character_words": character_words.tobytes(),
+        "character_lower": character_lower.tobytes(),
+        "location_exact": location_exact.tobytes(),
+        "location_words": location_words.tobytes(),
+        "location_lower": location_lower.tobytes(),
+        "entrance_offsets": entrance_offsets.tobytes(),
+        "entrance_sources": entrance_sources.tobytes(),
+        "entrance_directions": entrance_directions.tobytes(),
+        "landmark_distances": landmark_distances.tobytes(),
+    }
+
+    # Sections start on 8-byte boundaries so they can be viewed as typed arrays
+    offset = _HEADER.size + _SECTION.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        offset += -offset % 8
+        table.append((offset, len(blobs[name])))
+        offset += len(blobs[name])
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(SECTIONS)))
+        for entry in table:
+            f.write(_SECTION.pack(*entry))
+        for name, (start, _) in zip(SECTIONS, table):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(blobs[name])
+
+
+def _bisect_left(length, key_at, target):
+    """Return the first position in a sorted sequence whose key is not less than target."""
+    low, high = 0, length
+    while low < high:
+        middle = (low + high) // 2
+        if key_at(middle) < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class _LazyTable:
+    """Read-only sequence of records decoded from the cache on access."""
+
+    def __init__(self, length, decode):
+        self.length = length
+        self.decode = decode
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("record index out of range")
+        return self.decode(index)
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.decode(index)
+
+
+class _RegionPager:
+    """Location table that decodes a whole region on first use and keeps the most recently used."""
+
+    def __init__(self, world, capacity):
+        self.world = world
+        self.capacity = capacity
+        self.pages = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.world._location_of_row)
+
+    def __getitem__(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("location index out of range")
+
+        region = self.world._location_regions[index]
+        page = self.pages.get(region)
+        if page is None:
+            page = self._load(region)
+        else:
+            self.pages.move_to_end(region)
+        return page[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def _load(self, region):
+        """Decode every location in a region, evicting the coldest region if over capacity."""
+        world = self.world
+        start, end = world._region_starts[region], world._region_starts[region + 1]
+        page = {}
+        for row, index in enumerate(world._location_of_row[start:end].tolist(), start):
+            page[index] = world._decode_location(row, index)
+        self.pages[region] = page
+        self.loads += 1
+
+        if len(self.pages) > self.capacity:
+            self.pages.popitem(last=False)
+            self.evictions += 1
+        return page
+
+
+class _SortedIndex:
+    """Read-only ID to index mapping, searched in a sorted permutation of the records."""
+
+    def __init__(self, order, id_at):
+        self.order = order
+        self.id_at = id_at
+
+    def get(self, key, default=None):
+        order = self.order
+        position = _bisect_left(len(order), lambda i: self.id_at(order[i]), key)
+        if position < len(order) and self.id_at(order[position]) == key:
+            return order[position]
+        return default
+
+    def __getitem__(self, key):
+        index = self.get(key)
+        if index is None:
+            raise KeyError(key)
+        return index
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.order)
+
+
+class MappedNameIndex:
+    """Name lookups over sorted tables in the cache, with the same interface as NameIndex.
+
+    Exact names are found by binary search. A typed word matches every
+    entry in the sorted word table that starts with it, which is one
+    contiguous range, so no per-prefix tables need to be stored. As in
+    NameIndex.find, a crowded scope is probed with the matching records
+    rather than walked and decoded name by name.
+    """
+
+    def __init__(self, exact, words, lower, string):
+        self.exact = exact
+        self.words = words
+        self.lower = lower
+        self.string = string
+
+    def _exact_matches(self, text):
+        pairs = self.exact
+        position = _bisect_left(len(pairs) // 2, lambda i: self.string(pairs[2 * i]), text)
+        matches = []
+        while 2 * position < len(pairs) and self.string(pairs[2 * position]) == text:
+            matches.append(pairs[2 * position + 1])
+            position += 1
+        return matches
+
+    def _word_range(self, token):
+        pairs = self.words
+        count = len(pairs) // 2
+
+        def key_at(i):
+            return self.string(pairs[2 * i])
+
+        return _bisect_left(count, key_at, token), _bisect_left(count, key_at, token + "\U0010ffff")
+
+    def _matches(self, index, tokens):
+        words = self.string(self.lower[index]).split()
+        return all(any(word.startswith(token) for word in words) for token in tokens)
+
+    def find(self, text, *scopes):
+        """Return the first record in the given scopes matching text, or None."""
+        text = text.strip().lower()
+        tokens = text.split()
+        if not tokens:
+            return None
+
+        exact = frozenset(self._exact_matches(text))
+        low, high = min((self._word_range(token) for token in tokens), key=lambda r: r[1] - r[0])
+        partial = None
+        for scope in scopes:
+            if exact:
+                index = _first_in_scope(scope, exact, ())
+                if index is not None:
+                    return index
+
+            # Records sharing the narrowest word's prefix are few next to a crowded room,
+            # so they are checked once and probed for; a smaller scope is checked record by record
+            if high - low < len(scope):
+                if partial is None:
+                    partial = frozenset(self.words[2 * low + 1:2 * high:2])
+                    if len(tokens) > 1:
+                        partial = frozenset(index for index in partial if self._matches(index, tokens))
+                index = _first_in_scope(scope, partial, ())
+                if index is not None:
+                    return index
+            else:
+                for index in scope:
+                    if self._matches(index, tokens):
+                        return index
+        return None
+
+    def find_any(self, text):
+        """Return the lowest-numbered record anywhere in the world matching text, or None."""
+        text = text.strip().lower()
+        tokens = text.split()
+        if not tokens:
+            return None
+
+        exact = self._exact_matches(text)
+        if exact:
+            return exact[0]
+
+        # Walk the narrowest word range and check the other words per record
+        low, high = min((self._word_range(token) for token in tokens), key=lambda r: r[1] - r[0])
+        matches = [self.words[2 * position + 1] for position in range(low, high)]
+        matches = [index for index in matches if self._matches(index, tokens)]
+        return min(matches) if matches else None
+
+
+class _MappedLocation(Location):
+    """A Location whose description stays compressed until it is read."""
+
+    __slots__ = ('texts', 'description_text')
+    description = Prose('description_text')
+
+    def __init__(self, texts, *fields):
+        self.texts = texts
+        Location.__init__(self, *fields)
+
+
+class _MappedItem(Item):
+    """An Item whose description stays compressed until it is read."""
+
+    __slots__ = ('texts', 'description_text')
+    description = Prose('description_text')
+
+    def __init__(self, texts, *fields):
+        self.texts = texts
+        Item.__init__(self, *fields)
+
+
+class _MappedCharacter(Character):
+    """A Character whose description and dialogue stay compressed until they are read."""
+
+    __slots__ = ('texts', 'description_text', 'dialogue_text')
+    description = Prose('description_text')
+    dialogue = Prose('dialogue_text', json.loads)
+
+    def __init__(self, texts, *fields):
+        self.texts = texts
+        Character.__init__(self, *fields)
+
+
+class MappedWorld(World):
+    """A World backed by a memory-mapped compiled cache.
+
+    It offers the same attributes as a World compiled from a module, but
+    records, IDs and names are read from the mapped file on demand.
+    """
+
+    def __init__(self, path, region_cache_size=REGION_CACHE_SIZE):
+        self.module = None
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, count = _HEADER.unpack_from(view, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or count != len(SECTIONS):
+            raise ValueError(f"{path} is not a world cache this version can read")
+        sections = {}
+        for i, name in enumerate(SECTIONS):
+            start, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            sections[name] = view[start:start + length]
+
+        meta = json.loads(str(sections["meta"], "utf-8"))
+        if meta["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was compiled on a machine with a different byte order")
+
+        self._string_offsets = sections["string_offsets"].cast('q')
+        self._strings = sections["strings"]
+        self.texts = TextStore(sections["text_dictionary"], sections["text_offsets"].cast('q'), sections["texts"])
+        ints = {name: sections[name].cast('i') for name in SECTIONS[6:]}
+        self._location_rows = ints["locations"]
+        self._location_pool = ints["location_pool"]
+        self._item_rows = ints["items"]
+        self._character_rows = ints["characters"]
+        self._object_pool = ints["object_pool"]
+        self._row_of_location = ints["location_rows"]
+        self._location_of_row = ints["row_locations"]
+        self._location_regions = ints["location_regions"]
+        self._region_starts = ints["region_starts"]
+
+        self.game_info = meta["game_info"]
+        self._fingerprint = bytes.fromhex(meta["fingerprint"])
+        location_count, item_count, character_count = meta["counts"]
+
+        self.directions = meta["directions"]
+        self.direction_index = {direction: index for index, direction in enumerate(self.directions)}
+        exits = ints["exits"]
+        self.exits = [exits[d * location_count:(d + 1) * location_count] for d in range(len(self.directions))]
+
+        self.locations = _RegionPager(self, region_cache_size)
+        self.items = _LazyTable(item_count, functools.lru_cache(RECORD_CACHE_SIZE)(self._item))
+        self.characters = _LazyTable(character_count, functools.lru_cache(RECORD_CACHE_SIZE)(self._character))
+
+        self.location_ids = _LazyTable(
+            location_count, lambda i: self._field(self._location_rows, LOCATION_FIELDS, self._row_of_location[i]))
+        self.item_ids = _LazyTable(item_count, lambda i: self._field(self._item_rows, ITEM_FIELDS, i))
+        self.character_ids = _LazyTable(character_count,
+                                        lambda i: self._field(self._character_rows, CHARACTER_FIELDS, i))
+        self.location_index = _SortedIndex(ints["location_order"], self.location_ids.__getitem__)
+        self.item_index = _SortedIndex(ints["item_order"], self.item_ids.__getitem__)
+        self.character_index = _SortedIndex(ints["character_order"], self.character_ids.__getitem__)
+
+        self.item_names = MappedNameIndex(ints["item_exact"], ints["item_words"], ints["item_lower"], self._string)
+        self.character_names = MappedNameIndex(ints["character_exact"], ints["character_words"],
+                                               ints["character_lower"], self._string)
+        self.location_names = MappedNameIndex(ints["location_exact"], ints["location_words"],
+                                              ints["location_lower"], self._string)
+
+        self.start_location = meta["start_location"]
+        self.start_inventory = tuple(meta["start_inventory"])
+        self.max_inventory = meta["max_inventory"]
+        self.max_weight = meta["max_weight"]
+        self.start_weight = meta["start_weight"]
+        self.start_stats = meta["start_stats"]
+        self.rendered = RenderCache()
+        self.trigger_rules = meta["trigger_rules"]
+        self.triggers = compile_triggers(self, self.trigger_rules)
+        self.behaviours = {entry[0]: Behaviour(*entry) for entry in meta["behaviours"]}
+
+        distances = ints["landmark_distances"]
+        landmarks = [[distances[(2 * i) * location_count:(2 * i + 1) * location_count],
+                      distances[(2 * i + 1) * location_count:(2 * i + 2) * location_count]]
+                     for i in range(meta["landmarks"])]
+        reverse = (ints["entrance_offsets"], ints["entrance_sources"], ints["entrance_directions"])
+        self._router = Router(self, reverse, landmarks if location_count > ALL_PAIRS_LIMIT else None)
+
+    def _string(self, index):
+        offsets = self._string_offsets
+        return str(self._strings[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def _field(self, rows, width, row):
+        """Return the string in the first (ID) field of a fixed-size record."""
+        return self._string(rows[row * width])
+
+    def _decode_location(self, row, index):
+        """Decode the location stored in a given row of the location table."""
+        fields = self._location_rows[row * LOCATION_FIELDS:(row + 1) * LOCATION_FIELDS].tolist()
+        pool = self._location_pool
+        return _MappedLocation(
+            self.texts, index, self._string(fields[0]), self._string(fields[1]), fields[2],
+            tuple(pool[fields[4]:fields[4] + fields[5]].tolist()),
+            dict.fromkeys(pool[fields[6]:fields[6] + fields[7]].tolist()),
+            tuple(pool[fields[8]:fields[8] + fields[9]].tolist()),
+            bool(fields[3]))
+
+    def _item(self, index):
+        row = self._item_rows[index * ITEM_FIELDS:(index + 1) * ITEM_FIELDS].tolist()
+        actions = tuple(self._string(s) for s in self._object_pool[row[5]:row[5] + row[6]].tolist())
+        return _MappedItem(self.texts, index, self._string(row[0]), self._string(row[1]), row[2],
+                    bool(row[3]), bool(row[4]), actions, json.loads(self._string(row[7])))
+
+    def _character(self, index):
+        row = self._character_rows[index * CHARACTER_FIELDS:(index + 1) * CHARACTER_FIELDS].tolist()
+        return _MappedCharacter(self.texts, index, self._string(row[0]), self._string(row[1]), row[2],
+                                bool(row[3]), row[4], tuple(self._object_pool[row[5]:row[5] + row[6]].tolist()),
+                                json.loads(self._string(row[7])))
+
+
+def read_data_file(path):
+    """Load a JSON data file and return its tables as a module-like namespace."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    missing = [name for name in REQUIRED_TABLES if name not in data]
+    if missing:
+        raise ValueError(f"{path} is missing {', '.join(missing)}")
+    return types.SimpleNamespace(**{name: data[name] for name in REQUIRED_TABLES + OPTIONAL_TABLES if name in data})
+
+
+def _content_hash(path, cache_dir, stem):
+    """Return the hash of a data file, reusing the last one while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    key_path = os.path.join(cache_dir, stem + ".key")
+    try:
+        with open(key_path, encoding="utf-8") as f:
+            key = json.load(f)
+        if key["mtime_ns"] == stat.st_mtime_ns and key["size"] == stat.st_size:
+            return key["hash"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+
+    try:
+        with open(key_path, "w", encoding="utf-8") as f:
+            json.dump({"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": content_hash}, f)
+    except OSError:
+        pass
+    return content_hash
+
+
+def compile_data_file(path):
+    """Compile a data file's cache if it is missing or stale and return the cache's path."""
+    directory, name = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(name)[0]
+    cache_dir = os.path.join(directory, CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    cache_path = os.path.join(cache_dir, f"{stem}-{_content_hash(path, cache_dir, stem)}.grw")
+    if not os.path.exists(cache_path):
+        world = World(read_data_file(path))
+        write_cache(world, cache_path + ".tmp")
+        os.replace(cache_path + ".tmp", cache_path)
+
+        # Caches of earlier versions of this file are no longer needed
+        for old in glob.glob(os.path.join(glob.escape(cache_dir), glob.escape(stem) + "-*.grw")):
+            if old != cache_path:
+                os.remove(old)
+    return cache_path
+
+
+# Mapped worlds loaded so far, keyed by cache path
+_data_worlds = {}
+
+
+def load_data_world(path):
+    """Return the World for a data file, compiling and mapping its cache as needed."""
+    cache_path = compile_data_file(path)
+    world = _data_worlds.get(cache_path)
+    if world is None:
+        try:
+            world = MappedWorld(cache_path)
+        except (ValueError, struct.error):
+            # Written by another engine version or damaged; rebuild it
+            os.remove(cache_path)
+            world = MappedWorld(compile_data_file(path))
+        _data_worlds[cache_path] = world
+    return world
+
+
+def main():
+    for path in sys.argv[1:]:
+        print(f"{path} -> {compile_data_file(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,271 +1,529 @@
 # Grue Text Adventure Engine - Core Engine
 
+__version__ = "0.2"
+
+import re
+import sys
+
+from grue_commands import CommandTable
+from grue_registry import GameRegistry
+from grue_world import load_world
+from grue_state import WorldState, PlayerState
+
+# Command tables for games that add their own verbs, keyed by game module
+_game_commands = {}
+
+# What separates the commands of a chained line
+_COMMAND_SEPARATORS = re.compile(r"\s*(?:[,;]|\bthen\b)\s*")
+
+
 class GrueEngine:
     def __init__(self):
-        self.locations = {}
-        self.items = {}
-        self.characters = {}
-        self.player = {}
+        self.world = None
+        self.state = None
+        self.locations = []
+        self.items = []
+        self.characters = []
+        self.item_names = None
+        self.character_names = None
+        self.location_names = None
+        self.player = None
         self.game_info = {}
         self.running = False
         self.current_game = None
+        self.commands = DEFAULT_COMMANDS
+        self.save_game = None  # Optional grue_save.SaveGame journaling this session
+        self.history = None    # Optional grue_history.History of moves to undo, set by its attach()
+        self.command_log = None  # Optional grue_log.SessionLog recording each command
+        self.failed = False    # Whether the last command was refused or not understood
+        self.rewinding = False  # Whether the last command was undo or rewind
+        self.shared = None     # Optional grue_multiplayer.SharedPlayer when the world is shared
 
     def load_game(self, game_module):
         """Load data from a game module."""
         self.current_game = game_module
-        self.locations = game_module.locations
-        self.items = game_module.items
-        self.characters = game_module.characters
-        self.player = game_module.player.copy()  # Copy to allow multiple plays
-        self.game_info = game_module.game_info
+        self.world = load_world(game_module)
+
+        # The world is shared read-only between sessions
+        self.locations = self.world.locations
+        self.items = self.world.items
+        self.characters = self.world.characters
+        self.item_names = self.world.item_names
+        self.character_names = self.world.character_names
+        self.location_names = self.world.location_names
+        self.game_info = self.world.game_info
+
+        # Everything this session changes is kept in its own overlays
+        self.state = WorldState(self.world)
+        self.player = PlayerState(self.world)
+
+        self.commands = self._game_command_table(game_module)
+
+    def _game_command_table(self, game_module):
+        """Return the command table for a game, including any verbs it or its triggers define."""
+        game_commands = getattr(game_module, 'commands', None)
+        trigger_verbs = self.world.triggers.verbs
+        if not game_commands and not trigger_verbs:
+            return DEFAULT_COMMANDS
+
+        table = _game_commands.get(game_module)
+        if table is None:
+            table = DEFAULT_COMMANDS.copy()
+            for verb, spec in (game_commands or {}).items():
+                table.register([verb] + list(spec.get('aliases', [])), spec['handler'],
+                               spec.get('argument', False), usage=spec.get('usage'),
+                               description=spec.get('help'), rest_of_line=spec.get('rest_of_line', False))
+            # Verbs that only triggers use; the game's own commands and the defaults take precedence
+            for verb, on_item in trigger_verbs.items():
+                if verb not in table.verbs:
+                    table.register(verb, _trigger_handler(verb), on_item,
+                                   optional=on_item and verb in self.world.triggers.bare_verbs)
+            _game_commands[game_module] = table
+        return table
 
     def list_available_games(self):
         """Return a list of available games."""
-        # In a real implementation, this would scan a directory
-        # For now, we'll return a hardcoded list
-        return ["crystalia_manor", "dark_dungeon"]
+        return GameRegistry().ids()
 
     def start_game(self):
         """Start the game loop."""
         self.running = True
-        self.display_intro()
+        output = self.display_intro() + "\n"
 
-        # Main game loop
+        # Main game loop: each line's responses, location and prompt go out in one write
         while self.running:
-            self.display_location()
-            command = input("> ").strip().lower()
-            response = self.process_command(command)
-            print(response)
+            sys.stdout.write(f"{output}{self.display_location()}\n> ")
+            sys.stdout.flush()
+            line = input().strip().lower()
+            output = self.process_line(line) + "\n"
+        sys.stdout.write(output)
 
     def display_intro(self):
-        """Display the game introduction."""
-        print(f"\n{self.game_info['title']}")
-        print("=" * len(self.game_info['title']))
-        print(self.game_info['intro_text'])
-        print()
+        """Return the game introduction."""
+        return "\n".join([
+            f"\n{self.game_info['title']}",
+            "=" * len(self.game_info['title']),
+            self.game_info['intro_text'],
+            "",
+        ])
 
     def display_location(self):
-        """Display the current location description."""
-        location_id = self.player['current_location']
+        """Return the current location description.
+
+        The text is rendered once per location version and reused until
+        something in the location changes. Locations this session has not
+        changed share the world's cache with every other session.
+        """
+        location_id = self.player.current_location
+        version = self.state.version_of(location_id)
+        if version:
+            cached = self.state.rendered.get(location_id)
+            if cached is not None and cached[0] == version:
+                text = cached[1]
+            else:
+                text = self.render_location(location_id)
+                self.state.rendered[location_id] = (version, text)
+        else:
+            text = self.world.rendered.get(location_id, 0)
+            if text is None:
+                text = self.render_location(location_id)
+                self.world.rendered.put(location_id, 0, text)
+
+        # Other players come and go too often to be part of the cached text
+        if self.shared is not None:
+            text += self.shared.presence()
+        return text
+
+    def render_location(self, location_id):
+        """Build the description of a location as it currently stands."""
         location = self.locations[location_id]
 
-        print(f"\n{location['name']}")
-        print("-" * len(location['name']))
-        print(location['description'])
+        lines = [f"\n{location.name}", "-" * len(location.name), location.description]
 
         # Display exits
-        if location['exits']:
-            exit_list = ", ".join(location['exits'].keys())
-            print(f"Exits: {exit_list}")
+        exits = self.state.exits_at(location_id)
+        if exits:
+            directions = self.world.directions
+            exit_list = ", ".join([directions[direction] for direction in exits])
+            lines.append(f"Exits: {exit_list}")
         else:
-            print("There are no obvious exits.")
+            lines.append("There are no obvious exits.")
 
         # Display items
-        visible_items = [self.items[item_id]['name'] for item_id in location['items']
-                         if self.items[item_id]['visible']]
+        visible_items = [self.items[item_id].name for item_id in self.state.items_at(location_id)
+                         if self.state.is_visible(item_id)]
         if visible_items:
             if len(visible_items) == 1:
-                print(f"You can see a {visible_items[0]} here.")
+                lines.append(f"You can see a {visible_items[0]} here.")
             else:
                 item_list = ", ".join(visible_items[:-1]) + " and a " + visible_items[-1]
-                print(f"You can see a {item_list} here.")
+                lines.append(f"You can see a {item_list} here.")
 
         # Display characters
-        if location['characters']:
-            for char_id in location['characters']:
+        characters = self.state.characters_at(location_id)
+        if characters:
+            for char_id in characters:
                 char = self.characters[char_id]
-                print(f"There is {char['name']} here.")
+                lines.append(f"There is {char.name} here.")
+
+        return "\n".join(lines)
 
     def process_command(self, command):
         """Process a player command and return the response."""
+        history = self.history
+        if history is not None and self.state is not history.state:
+            history.start(self)  # The state was replaced since the history last saw it
+        source = self.player.current_location
+        carried = len(self.player.inventory)
+
         # Update move counter for every command
-        self.player['stats']['moves'] += 1
-
-        # Very basic command processing
-        if command in ["quit", "exit", "bye"]:
-            self.running = False
-            return "Thanks for playing!"
-
-        elif command in ["look", "l"]:
-            # We'll let the next loop iteration display the location
-            return "You look around."
-
-        elif command.startswith("go "):
-            direction = command[3:]  # Remove "go " from the start
-            return self.move_player(direction)
-
-        elif command in ["north", "n", "south", "s", "east", "e", "west", "w", "up", "u", "down", "d"]:
-            # Handle directional shortcuts
-            direction_map = {
-                "n": "north", "s": "south", "e": "east", "w": "west",
-                "u": "up", "d": "down"
-            }
-            direction = direction_map.get(command, command)  # Convert shorthand to full direction
-            return self.move_player(direction)
-
-        elif command in ["inventory", "i"]:
-            return self.show_inventory()
-
-        elif command.startswith("take ") or command.startswith("get "):
-            item_name = command[5:] if command.startswith("take ") else command[4:]
-            return self.take_item(item_name)
-
-        elif command.startswith("drop "):
-            item_name = command[5:]
-            return self.drop_item(item_name)
-
-        elif command.startswith("examine ") or command.startswith("look at "):
-            target = command[8:] if command.startswith("examine ") else command[8:]
-            return self.examine(target)
-
-        elif command.startswith("talk to "):
-            char_name = command[8:]
-            return self.talk_to(char_name)
-
-        elif command in ["help", "h", "?"]:
-            return """
-Available commands:
-- go [direction] : Move in a direction (north, south, east, west, up, down)
-- look           : Look around
-- inventory      : Check what you're carrying
-- take [item]    : Pick up an item
-- drop [item]    : Drop an item you're carrying
-- examine [thing]: Look at something more closely
-- talk to [char] : Talk to a character
-- quit           : End the game
-You can also use shortcuts: n, s, e, w for directions, l for look, i for inventory
-"""
+        self.player.stats['moves'] += 1
+
+        self.failed = False
+        self.rewinding = False
+        entry, argument = self.commands.lookup(command)
+        if entry is None:
+            response = self.refuse("I don't understand that command. Type 'help' for a list of commands.")
+        elif argument is None:
+            response = entry.handler(self)
         else:
-            return "I don't understand that command. Type 'help' for a list of commands."
+            response = entry.handler(self, argument)
+
+        # Undo and rewind take moves back rather than make one, and leave the restored state as it was
+        rewinding = self.rewinding
+        rewound = rewinding and not self.failed
+        if rewinding and self.failed:
+            self.player.stats['moves'] -= 1
+
+        # Characters with somewhere to be take their turn (a shared world runs them on its own clock)
+        schedule = self.state.schedule
+        if schedule is not None and self.shared is None and not rewinding:
+            news = schedule.advance(self.state, (self.player.current_location,))
+            if news:
+                response = "\n".join([response] + [text for _, text in news])
+
+        if history is not None and not rewinding:
+            history.record(self)
+        if self.command_log is not None:
+            inventory = self.player.inventory
+            item = next(reversed(inventory)) if len(inventory) > carried and not rewound else -1
+            self.command_log.record(entry and entry.name, source, self.player.current_location, item)
+        if self.save_game is not None and not (rewinding and self.failed):
+            self.save_game.record(self, command)
+            if rewound:
+                # A restore has no history to undo into, so it must start after the rewind
+                self.save_game.checkpoint(self)
+        return response
+
+    def process_line(self, line):
+        """Run each command on a line in turn and return their responses together.
+
+        Commands are separated by commas, semicolons or "then"; the batch
+        stops after the first command that fails or quits the game, so
+        "n, take sword" never takes a sword from the wrong room.
+        """
+        running = self.running
+        responses = []
+        for command in split_commands(line, self.commands):
+            responses.append(self.process_command(command))
+            if self.failed or (running and not self.running):
+                break
+        return "\n".join(responses)
+
+    def refuse(self, message):
+        """Mark the current command as failed and return the message explaining why."""
+        self.failed = True
+        return message
+
+    def undo(self):
+        """Take back the last move."""
+        return self.rewind("1")
+
+    def rewind(self, moves):
+        """Take back a number of moves."""
+        self.rewinding = True
+        if self.history is None:
+            return self.refuse("You can't undo moves in this game.")
+        if not moves.isdigit() or int(moves) < 1:
+            return self.refuse("Rewind how many moves?")
+        moves = int(moves)
+        available = self.history.moves_back()
+        if available == 0:
+            return self.refuse("There is nothing to undo.")
+        if moves > available:
+            return self.refuse(f"You can only rewind {available} move{'s' if available != 1 else ''}.")
+        self.history.rewind(self, moves)
+        if moves == 1:
+            return "Previous move undone."
+        return f"Rewound {moves} moves."
+
+    def quit_game(self):
+        """End the game loop."""
+        self.running = False
+        return "Thanks for playing!"
+
+    def look(self):
+        """Look around the current location."""
+        # We'll let the next loop iteration display the location
+        return "You look around."
+
+    def show_help(self):
+        """Return the list of available commands."""
+        return self.commands.help_text()
+
+    def register_command(self, verbs, handler, takes_argument=False, usage=None, description=None,
+                         rest_of_line=False):
+        """Add a verb to this session's command table.
+
+        Handlers are called as handler(engine) or, for verbs that take an
+        argument, handler(engine, argument) and return the response text.
+        With rest_of_line, the argument is everything after the verb, even
+        commas or "then".
+        """
+        if self.commands is DEFAULT_COMMANDS or self.commands is _game_commands.get(self.current_game):
+            self.commands = self.commands.copy()  # The table every session of the game shares
+        self.commands.register(verbs, handler, takes_argument, usage=usage, description=description,
+                               rest_of_line=rest_of_line)
 
     def move_player(self, direction):
         """Move the player in the specified direction if possible."""
-        current_loc = self.locations[self.player['current_location']]
-
-        if direction in current_loc['exits']:
-            new_location_id = current_loc['exits'][direction]
-            self.player['current_location'] = new_location_id
+        direction_index = self.world.direction_index.get(direction)
+        new_location_id = -1
+        if direction_index is not None:
+            new_location_id = self.state.exit_target(self.player.current_location, direction_index)
+
+        if new_location_id >= 0:
+            triggers = self.world.triggers
+            old_location_id = self.player.current_location
+            leaving = triggers.fire(self, triggers.for_location(old_location_id, "leave"))
+            self.player.current_location = new_location_id
+            if self.shared is not None:
+                self.shared.moved(old_location_id, new_location_id, direction)
             new_loc = self.locations[new_location_id]
 
             # If it's the first visit, we'll just let the main loop show the description
-            if new_loc['first_visit']:
-                new_loc['first_visit'] = False
-                return f"You go {direction} to {new_loc['name']}."
+            if self.player.is_first_visit(new_location_id, self.world):
+                self.player.visit(new_location_id)
+                response = f"You go {direction} to {new_loc.name}."
             else:
-                return f"You go {direction} to {new_loc['name']}."
+                response = f"You go {direction} to {new_loc.name}."
+
+            entering = triggers.fire(self, triggers.for_location(new_location_id, "enter"))
+            return "\n".join(message for message in (leaving, response, entering) if message)
+        else:
+            return self.refuse(f"You can't go {direction} from here.")
+
+    def travel(self, place):
+        """Walk the shortest route to a named location."""
+        target = self.location_names.find_any(place)
+        if target is None:
+            return self.refuse(f"You don't know of any place called {place}.")
+
+        name = self.locations[target].name
+        if target == self.player.current_location:
+            return self.refuse(f"You are already in {name}.")
+
+        route = self.state.route(self.player.current_location, target)
+        if route is None:
+            return self.refuse(f"You can't find a way to {name} from here.")
+
+        # Walk it step by step so every room on the way is entered as usual,
+        # stopping where a step is refused or a trigger takes the player elsewhere
+        directions = self.world.directions
+        responses = []
+        for direction in route:
+            expected = self.state.exit_target(self.player.current_location, direction)
+            responses.append(self.move_player(directions[direction]))
+            if self.failed or self.player.current_location != expected:
+                break
+        if self.player.current_location == target:
+            moves = "move" if len(route) == 1 else "moves"
+            responses.append(f"You make your way to {name} ({len(route)} {moves}).")
         else:
-            return f"You can't go {direction} from here."
+            here = self.locations[self.player.current_location].name
+            responses.append(self.refuse(f"You stop in {here}, short of {name}."))
+        return "\n".join(responses)
 
     def show_inventory(self):
         """Show what the player is carrying."""
-        if not self.player['inventory']:
+        if not self.player.inventory:
             return "You are not carrying anything."
 
-        items_carried = [self.items[item_id]['name'] for item_id in self.player['inventory']]
+        items_carried = [self.items[item_id].name for item_id in self.player.inventory]
         if len(items_carried) == 1:
             return f"You are carrying a {items_carried[0]}."
         else:
             item_list = ", ".join([f"a {item}" for item in items_carried[:-1]]) + f" and a {items_carried[-1]}"
             return f"You are carrying {item_list}."
 
-    def get_item_id_from_name(self, item_name):
-        """Convert an item name to its ID. Returns None if not found."""
-        # First check if item_name is an exact ID
-        if item_name in self.items:
-            return item_name
-
-        # Try to match by name
-        for item_id, item in self.items.items():
-            if item['name'].lower() == item_name.lower():
-                return item_id
-
-        # Try to match by partial name (less precise)
-        for item_id, item in self.items.items():
-            if item_name.lower() in item['name'].lower():
-                return item_id
+    def get_item_id_from_name(self, item_name, *scopes):
+        """Convert an item name to its ID. Returns None if not found.
 
-        return None
+        Items in the given scopes (such as the inventory or the current
+        location's items) are preferred over matches elsewhere in the world.
+        """
+        item_id = self.item_names.find(item_name, *scopes)
+        if item_id is None:
+            item_id = self.item_names.find_any(item_name)
+        return item_id
 
     def take_item(self, item_name):
         """Try to take an item from the current location."""
-        item_id = self.get_item_id_from_name(item_name)
+        location_id = self.player.current_location
+        item_id = self.get_item_id_from_name(item_name, self.state.items_at(location_id), self.player.inventory)
 
-        if not item_id:
-            return f"You don't see a {item_name} here."
+        if item_id is None:
+            return self.refuse(f"You don't see a {item_name} here.")
 
-        current_loc = self.locations[self.player['current_location']]
-
-        if item_id not in current_loc['items']:
-            return f"You don't see a {item_name} here."
+        if item_id not in self.state.items_at(location_id):
+            return self.refuse(f"You don't see a {item_name} here.")
 
         item = self.items[item_id]
 
-        if not item['portable']:
-            return f"You can't take the {item['name']}."
+        if not item.portable:
+            return self.refuse(f"You can't take the {item.name}.")
+
+        if len(self.player.inventory) >= self.player.max_inventory:
+            return self.refuse("You can't carry any more items.")
 
-        if len(self.player['inventory']) >= self.player['max_inventory']:
-            return "You can't carry any more items."
+        if not self.player.can_carry(item.weight):
+            return self.refuse(f"The {item.name} is too heavy to carry with everything else you have.")
 
         # Remove from location and add to inventory
-        current_loc['items'].remove(item_id)
-        self.player['inventory'].append(item_id)
+        self.state.remove_item(location_id, item_id)
+        self.player.carry(item_id, item.weight)
+        if self.shared is not None:
+            self.shared.announce(f"{self.shared.name} takes the {item.name}.")
 
-        return f"You take the {item['name']}."
+        return f"You take the {item.name}."
 
     def drop_item(self, item_name):
         """Drop an item from inventory to the current location."""
-        item_id = self.get_item_id_from_name(item_name)
+        location_id = self.player.current_location
+        item_id = self.get_item_id_from_name(item_name, self.player.inventory, self.state.items_at(location_id))
 
-        if not item_id or item_id not in self.player['inventory']:
-            return f"You don't have a {item_name}."
+        if item_id is None or item_id not in self.player.inventory:
+            return self.refuse(f"You don't have a {item_name}.")
 
         item = self.items[item_id]
 
         # Remove from inventory and add to location
-        self.player['inventory'].remove(item_id)
-        current_loc = self.locations[self.player['current_location']]
-        current_loc['items'].append(item_id)
+        self.player.put_down(item_id, item.weight)
+        self.state.add_item(location_id, item_id)
+        if self.shared is not None:
+            self.shared.announce(f"{self.shared.name} drops the {item.name}.")
 
-        return f"You drop the {item['name']}."
+        return f"You drop the {item.name}."
 
     def examine(self, target_name):
         """Examine an item, character, or feature more closely."""
-        # First check inventory
-        for item_id in self.player['inventory']:
-            item = self.items[item_id]
-            if target_name.lower() in item['name'].lower():
-                return item['description']
-
-        # Then check location items
-        current_loc = self.locations[self.player['current_location']]
-        for item_id in current_loc['items']:
-            item = self.items[item_id]
-            if target_name.lower() in item['name'].lower():
-                return item['description']
+        # First check inventory, then location items
+        location_id = self.player.current_location
+        item_id = self.item_names.find(target_name, self.player.inventory, self.state.items_at(location_id))
+        if item_id is not None:
+            return self.items[item_id].description
 
         # Then check location characters
-        for char_id in current_loc['characters']:
-            char = self.characters[char_id]
-            if target_name.lower() in char['name'].lower():
-                return char['description']
+        char_id = self.character_names.find(target_name, self.state.characters_at(location_id))
+        if char_id is not None:
+            return self.characters[char_id].description
 
         # If nothing matches
-        return f"You don't see any {target_name} here."
+        return self.refuse(f"You don't see any {target_name} here.")
 
     def talk_to(self, char_name):
         """Talk to a character in the current location."""
-        current_loc = self.locations[self.player['current_location']]
-
         # Find character by name
-        target_char = None
-        for char_id in current_loc['characters']:
-            char = self.characters[char_id]
-            if char_name.lower() in char['name'].lower():
-                target_char = char
-                break
+        char_id = self.character_names.find(char_name,
+                                                  self.state.characters_at(self.player.current_location))
+
+        if char_id is None:
+            return self.refuse(f"There's no {char_name} here to talk to.")
 
-        if not target_char:
-            return f"There's no {char_name} here to talk to."
+        target_char = self.characters[char_id]
 
         # For now, just return the greeting dialogue
-        return f"{target_char['name']}: \"{target_char['dialogue']['greeting']}\""
\ No newline at end of file
+        return f"{target_char.name}: \"{target_char.dialogue['greeting']}\""
+
+    def interact(self, verb, target_name=None):
+        """Run the game's triggers for a verb, used on an item or (with no target) in the current location."""
+        location_id = self.player.current_location
+        triggers = self.world.triggers
+        if target_name is None:
+            response = triggers.fire(self, triggers.for_location(location_id, verb), refuse=True)
+            return self.refuse("Nothing happens.") if response is None else response
+
+        # "unlock door with key", "use key on door": the first item named is the one acted on
+        for separator in (" with ", " on "):
+            target_name, found, other_name = target_name.partition(separator)
+            if found:
+                break
+        item_id = self.item_names.find(target_name, self.player.inventory, self.state.items_at(location_id))
+        if item_id is None:
+            return self.refuse(f"You don't see a {target_name} here.")
+        if found and self.item_names.find(other_name, self.player.inventory, self.state.items_at(location_id)) is None:
+            return self.refuse(f"You don't see a {other_name} here.")
+
+        response = triggers.fire(self, triggers.for_item(verb, item_id), refuse=True)
+        if response is None:
+            return self.refuse(f"You can't {verb} the {self.items[item_id].name}.")
+        return response
+
+
+def split_commands(line, commands=None):
+    """Split a line of chained commands ("n, take sword then s") into the separate commands.
+
+    With a command table, a command whose verb takes the rest of the line
+    (such as "say hello, then follow me") runs to the end of the line.
+    """
+    parts = []
+    start = 0
+    for separator in _COMMAND_SEPARATORS.finditer(line):
+        command = line[start:separator.start()]
+        if commands is not None and commands.takes_rest_of_line(command):
+            break
+        if command:
+            parts.append(command)
+        start = separator.end()
+    if line[start:]:
+        parts.append(line[start:])
+    return parts
+
+
+def _trigger_handler(verb):
+    """Return a command handler that runs the triggers for a verb."""
+    def handler(engine, target_name=None):
+        return engine.interact(verb, target_name)
+    return handler
+
+
+def _build_default_commands():
+    """Build the command table shared by every game."""
+    table = CommandTable()
+    table.register("go", GrueEngine.move_player, takes_argument=True,
+                   usage="go [direction]", description="Move in a direction (north, south, east, west, up, down)")
+    for direction, shortcut in [("north", "n"), ("south", "s"), ("east", "e"),
+                                ("west", "w"), ("up", "u"), ("down", "d")]:
+        table.register([direction, shortcut], GrueEngine.move_player, argument=direction)
+    table.register(["go to", "travel to", "travel"], GrueEngine.travel, takes_argument=True,
+                   usage="go to [place]", description="Walk to a place by the shortest route")
+    table.register(["look", "l"], GrueEngine.look,
+                   usage="look", description="Look around")
+    table.register(["inventory", "i"], GrueEngine.show_inventory,
+                   usage="inventory", description="Check what you're carrying")
+    table.register(["take", "get"], GrueEngine.take_item, takes_argument=True,
+                   usage="take [item]", description="Pick up an item")
+    table.register("drop", GrueEngine.drop_item, takes_argument=True,
+                   usage="drop [item]", description="Drop an item you're carrying")
+    table.register(["examine", "look at"], GrueEngine.examine, takes_argument=True,
+                   usage="examine [thing]", description="Look at something more closely")
+    table.register("talk to", GrueEngine.talk_to, takes_argument=True,
+                   usage="talk to [char]", description="Talk to a character")
+    table.register(["quit", "exit", "bye"], GrueEngine.quit_game,
+                   usage="quit", description="End the game")
+    table.register(["help", "h", "?"], GrueEngine.show_help)
+    table.help_footer = "You can also use shortcuts: n, s, e, w for directions, l for look, i for inventory"
+    return table
+
+
+DEFAULT_COMMANDS = _build_default_commands()
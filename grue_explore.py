@@ -0,0 +1,305 @@
+# Grue Text Adventure Engine - State-Space Explorer
+#
+# Plays every command that can make a difference (each move, taking and
+# dropping each item, talking to each character, and the verbs the game
+# and its triggers add) from every reachable state, breadth first and
+# without a terminal, then reports the rooms no player can reach, the
+# items no player can pick up, the rooms with no way back to the start,
+# and the shortest command sequence that reaches a goal:
+#
+#     python grue_explore.py dark_dungeon --goal-item treasure --workers 4
+#
+# States are held as grue_save encodings and recognised by a 16-byte hash,
+# so only the current frontier keeps whole states in memory. The hash leaves
+# out the moving characters' clock: where they are counts, but not how many
+# ticks have passed, or no two states of a game with wanderers would match. Each level of
+# the search is split into chunks that worker processes expand in parallel.
+
+import argparse
+import hashlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from grue_engine import GrueEngine
+from grue_registry import GameRegistry
+from grue_save import encode_state, decode_state
+
+REGISTRY = GameRegistry()
+
+# States handed to a worker at a time
+CHUNK_SIZE = 256
+
+# Distinct states to stop after unless told otherwise
+DEFAULT_MAX_STATES = 1000000
+
+
+def normalized_state(engine, clock=True):
+    """Return the encoding of an engine's state, leaving out the move counter and the rooms visited.
+
+    Those only record how the player got here, so two sessions that differ
+    in nothing else count as the same state. Without clock, the moving
+    characters' schedule is left out as well.
+    """
+    player, state = engine.player, engine.state
+    stats, visited, schedule = player.stats, player.visited, state.schedule
+    if 'moves' in stats:
+        player.stats = dict(stats, moves=0)
+    player.visited = set()
+    if not clock:
+        state.schedule = None
+    try:
+        return encode_state(state, player)
+    finally:
+        player.stats, player.visited, state.schedule = stats, visited, schedule
+
+
+def state_hash(data):
+    """Return the 16-byte hash a state encoding is known by."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def state_key(engine, data):
+    """Return the hash the engine's state is known by, given its normalized_state() encoding."""
+    if engine.state.schedule is None:
+        return state_hash(data)
+    return state_hash(normalized_state(engine, clock=False))
+
+
+def legal_commands(engine):
+    """Return every command worth trying in the engine's current state."""
+    world, state = engine.world, engine.state
+    location = engine.player.current_location
+    commands = [f"go {world.directions[direction]}" for direction in state.exits_at(location)]
+
+    # Things are named by ID, so two items sharing a name are each tried
+    names = []
+    for verb, items in (("take", state.items_at(location)), ("drop", engine.player.inventory)):
+        for item in items:
+            name = world.item_ids[item].lower()
+            commands.append(f"{verb} {name}")
+            names.append(name)
+    for character in state.characters_at(location):
+        name = world.character_ids[character].lower()
+        commands.append(f"talk to {name}")
+        names.append(name)
+
+    # Verbs the game and its triggers add are tried on everything in reach
+    verbs = {verb: spec.get('argument', False)
+             for verb, spec in (getattr(engine.current_game, 'commands', None) or {}).items()}
+    for verb, on_item in world.triggers.verbs.items():
+        verbs.setdefault(verb, on_item)
+    for verb, on_item in verbs.items():
+        if on_item:
+            commands.extend(f"{verb} {name}" for name in names)
+        if not on_item or verb in world.triggers.bare_verbs:
+            commands.append(verb)
+    return list(dict.fromkeys(commands))
+
+
+class Explorer:
+    """Expands the states of one game. Every worker process holds its own."""
+
+    def __init__(self, game_id, goal_locations=(), goal_items=()):
+        self.engine = GrueEngine()
+        self.engine.load_game(REGISTRY.load(game_id))
+        self.goal_locations = frozenset(goal_locations)
+        self.goal_items = frozenset(goal_items)
+
+    def is_goal(self):
+        """Return True if the engine's current state meets every goal."""
+        player = self.engine.player
+        if self.goal_locations and player.current_location not in self.goal_locations:
+            return False
+        return self.goal_items.issubset(player.inventory)
+
+    def expand(self, chunk):
+        """Play every legal command from each (hash, state) in chunk.
+
+        Returns a dict of the new states found, mapping each one's hash to
+        (parent hash, command, state, is_goal), plus the set of locations
+        entered, the set of items carried and the set of (location, target)
+        exits open along the way.
+        """
+        engine = self.engine
+        world = engine.world
+        children = {}
+        locations = set()
+        carried = set()
+        exits = set()
+
+        for parent, data in chunk:
+            engine.state, engine.player = decode_state(data, world)
+            state, location = engine.state, engine.player.current_location
+            exits.update((location, state.exit_target(location, direction)) for direction in state.exits_at(location))
+            for command in legal_commands(engine):
+                engine.state, engine.player = decode_state(data, world)
+                engine.process_command(command)
+                child = normalized_state(engine)
+                key = state_key(engine, child)
+                if key == parent:
+                    continue
+                if key not in children:
+                    children[key] = (parent, command, child, self.is_goal())
+                locations.add(engine.player.current_location)
+                carried.update(engine.player.inventory)
+        return children, locations, carried, exits
+
+
+# The Explorer of a worker process, set up once by _start_worker
+_explorer = None
+
+
+def _start_worker(game_id, goal_locations, goal_items):
+    global _explorer
+    _explorer = Explorer(game_id, goal_locations, goal_items)
+
+
+def _expand(chunk):
+    return _explorer.expand(chunk)
+
+
+def explore(game_id, goal_locations=(), goal_items=(), workers=1, max_states=DEFAULT_MAX_STATES, max_depth=None):
+    """Search the states of a game reachable from its start and return what was found.
+
+    Goals are location and item indexes: a goal state has the player in
+    one of the goal locations (if any are given) carrying every goal item.
+    """
+    started = time.perf_counter()
+    explorer = Explorer(game_id, goal_locations, goal_items)
+    engine = explorer.engine
+    world = engine.world
+    has_goal = bool(goal_locations or goal_items)
+
+    start = normalized_state(engine)
+    start_key = state_key(engine, start)
+    parents = {start_key: None}  # State hash -> (parent hash, command)
+    frontier = [(start_key, start)]
+    locations = {engine.player.current_location}
+    carried = set(engine.player.inventory)
+    exits = set()
+    solution = start_key if has_goal and explorer.is_goal() else None
+    depth = 0
+    complete = True
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_start_worker,
+                                   initargs=(game_id, tuple(goal_locations), tuple(goal_items)))
+    try:
+        while frontier:
+            if (max_depth is not None and depth >= max_depth) or len(parents) >= max_states:
+                complete = False
+                break
+
+            chunks = [frontier[i:i + CHUNK_SIZE] for i in range(0, len(frontier), CHUNK_SIZE)]
+            results = pool.map(_expand, chunks) if pool is not None else map(explorer.expand, chunks)
+            frontier = []
+            for children, chunk_locations, chunk_carried, chunk_exits in results:
+                locations |= chunk_locations
+                carried |= chunk_carried
+                exits |= chunk_exits
+                for key, (parent, command, data, goal) in children.items():
+                    if key in parents:
+                        continue
+                    parents[key] = (parent, command)
+                    frontier.append((key, data))
+                    if goal and solution is None:
+                        solution = key
+            if frontier:
+                depth += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Breadth first, so the first goal state found is one of the closest
+    commands = None
+    if solution is not None:
+        commands = []
+        key = solution
+        while parents[key] is not None:
+            key, command = parents[key]
+            commands.append(command)
+        commands.reverse()
+
+    # A room is a dead end if the player can get in but there is no way back to the start
+    # through the exits open in the states the search expanded, including those triggers opened
+    sources = {}
+    for source, target in exits:
+        sources.setdefault(target, []).append(source)
+    back = {world.start_location}
+    pending = [world.start_location]
+    while pending:
+        for source in sources.get(pending.pop(), ()):
+            if source not in back:
+                back.add(source)
+                pending.append(source)
+    dead_ends = sorted(location for location in locations if location not in back)
+
+    return {
+        "game": game_id,
+        "states": len(parents),
+        "depth": depth,
+        "complete": complete,
+        "elapsed": time.perf_counter() - started,
+        "unreachable_rooms": [world.location_ids[i] for i in range(len(world.locations)) if i not in locations],
+        "untakeable_items": [world.item_ids[i] for i in range(len(world.items)) if i not in carried],
+        "dead_ends": [world.location_ids[i] for i in dead_ends],
+        "solution": commands,
+        "has_goal": has_goal,
+    }
+
+
+def format_report(report):
+    """Return a printable summary of what explore found."""
+    status = "complete" if report["complete"] else "stopped early"
+    rows = [
+        ("States", f"{report['states']:,} ({status})"),
+        ("Depth", f"{report['depth']}"),
+        ("Elapsed", f"{report['elapsed']:.3f}s"),
+    ]
+    lines = [f"{label + ':':<15} {value}" for label, value in rows]
+
+    for label, key in [("Unreachable rooms", "unreachable_rooms"), ("Untakeable items", "untakeable_items"),
+                       ("Dead ends", "dead_ends")]:
+        lines.append(f"\n{label} ({len(report[key])}):")
+        lines.extend(f"  {entry}" for entry in report[key])
+
+    if report["has_goal"]:
+        if report["solution"] is None:
+            lines.append("\nNo solution found.")
+        else:
+            lines.append(f"\nShortest solution ({len(report['solution'])} commands):")
+            lines.extend(f"  {command}" for command in report["solution"])
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explore every reachable state of a Grue game.")
+    parser.add_argument("game", choices=REGISTRY.ids(), help="game to explore")
+    parser.add_argument("--goal-location", action="append", default=[], metavar="ID",
+                        help="location a solution must end in (repeatable: any of them)")
+    parser.add_argument("--goal-item", action="append", default=[], metavar="ID",
+                        help="item a solution must be carrying (repeatable: all of them)")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument("--max-states", type=int, default=DEFAULT_MAX_STATES,
+                        help="stop once this many distinct states are known, checked after each level "
+                             "(default: %(default)s)")
+    parser.add_argument("--max-depth", type=int, help="stop after this many commands from the start")
+    args = parser.parse_args()
+
+    engine = GrueEngine()
+    engine.load_game(REGISTRY.load(args.game))
+    try:
+        goal_locations = [engine.world.location_index[location_id] for location_id in args.goal_location]
+        goal_items = [engine.world.item_index[item_id] for item_id in args.goal_item]
+    except KeyError as error:
+        parser.error(f"unknown location or item {error}")
+
+    report = explore(args.game, goal_locations, goal_items, args.workers, args.max_states, args.max_depth)
+    print(format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
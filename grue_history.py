@@ -0,0 +1,141 @@
+# Grue Text Adventure Engine - Undo History
+#
+# Keeps what every command changed so players can take moves back and
+# testers can branch off from any earlier point:
+#
+#     History(depth=100).attach(engine)     # after engine.load_game
+#     engine.process_command("take lamp")
+#     engine.process_command("undo")        # or "rewind 5"
+#     state, player = engine.history.state_at(3)
+#
+# While a history is kept, the session's world state lists the old value
+# of each table entry (a room's items, a location's version, a character's
+# place, ...) the first time a command changes it. Each command leaves
+# behind that list and a copy of the player, so it costs time and memory
+# in proportion to what it changed, however large the world and however
+# much the player changed before. Rewinding puts the listed values back,
+# newest first, and costs what the moves taken back changed, plus
+# rebuilding the moving characters' queue. state_at() copies the whole
+# session first, so it costs what the session has changed. The oldest
+# moves are forgotten once there are more than `depth` of them or they
+# hold more than `max_changes` entries between them.
+
+from collections import deque
+
+from grue_engine import GrueEngine
+
+# Moves that can be taken back unless told otherwise
+DEFAULT_DEPTH = 100
+
+# Most table entries, items and counters kept for the moves, across all of them
+DEFAULT_MAX_CHANGES = 100000
+
+
+class History:
+    """The moves of one session as (changes, player, version, tick, size), oldest first.
+
+    Each move holds the world state's journal of what it changed, and the
+    player, global version and tick from before it. state is the world
+    state being journaled, and player, version and tick are kept as of the
+    last command. Once attached to an engine, every command the engine
+    runs adds a move.
+    """
+
+    def __init__(self, depth=DEFAULT_DEPTH, max_changes=DEFAULT_MAX_CHANGES):
+        self.depth = depth
+        self.max_changes = max_changes
+        self.moves = deque()
+        self.size = 0  # Entries held across all moves
+        self.state = None
+        self.player = None
+        self.version = 0
+        self.tick = 0
+
+    def __len__(self):
+        return len(self.moves)
+
+    def attach(self, engine):
+        """Keep this history for an engine and give its player the undo and rewind commands."""
+        engine.history = self
+        self.start(engine)
+        engine.register_command("undo", GrueEngine.undo, usage="undo", description="Take back your last move")
+        engine.register_command("rewind", GrueEngine.rewind, takes_argument=True,
+                                usage="rewind [moves]", description="Take back several moves")
+
+    def start(self, engine):
+        """Forget every move and keep the history from the engine's current state on."""
+        if self.state is not None:
+            self.state.journal = None
+        self.moves.clear()
+        self.size = 0
+        self.state = engine.state
+        self.state.journal = []
+        self.state.owned.clear()
+        self._mark(engine)
+
+    def _mark(self, engine):
+        """Note the engine's player, version and tick as the starting point of the next move."""
+        state = engine.state
+        self.player = engine.player.copy()
+        self.version = state.version
+        self.tick = 0 if state.schedule is None else state.schedule.tick
+
+    def moves_back(self):
+        """Return how many moves can currently be taken back."""
+        return len(self.moves)
+
+    def record(self, engine):
+        """Add the move the engine just made, forgetting the oldest ones over the limits."""
+        state, player = engine.state, self.player
+        if state is not self.state:
+            self.start(engine)
+            return
+        # What the command changed, and the inventory and counters every move copies
+        size = len(state.journal) + state.copied + len(player.inventory) + len(player.stats)
+        if not player.visited_shared:
+            size += len(player.visited)
+        self.moves.append((state.journal, player, self.version, self.tick, size))
+        self.size += size
+        state.journal = []
+        state.owned.clear()
+        state.copied = 0
+        self._mark(engine)
+
+        moves = self.moves
+        while moves and (len(moves) > self.depth or self.size > self.max_changes):
+            self.size -= moves.popleft()[4]
+
+    def _unwind(self, state, moves):
+        """Revert a world state to a number of moves ago and return the player from then."""
+        state.revert(self.state.journal)  # Anything changed since the last command
+        player, version, tick = self.player, self.version, self.tick
+        for index in range(len(self.moves) - 1, len(self.moves) - 1 - moves, -1):
+            changes, player, version, tick, _ = self.moves[index]
+            state.revert(changes)
+        state.version = version
+        if state.schedule is not None:
+            state.schedule.tick = tick
+            state.schedule.reschedule()
+        return player.copy()
+
+    def state_at(self, moves):
+        """Return copies of (WorldState, PlayerState) as they were a number of moves ago."""
+        if not 0 <= moves <= self.moves_back():
+            raise IndexError(f"only {self.moves_back()} moves back are kept")
+        state = self.state.copy()
+        return state, self._unwind(state, moves)
+
+    def rewind(self, engine, moves):
+        """Put the engine back the given number of moves, forgetting the moves after it."""
+        engine.player = self._unwind(engine.state, moves)
+        for _ in range(moves):
+            self.size -= self.moves.pop()[4]
+        self.state.journal = []
+        self.state.owned.clear()
+        self.state.copied = 0
+        self._mark(engine)
+
+    def clear(self):
+        """Forget every move."""
+        self.moves.clear()
+        self.size = 0
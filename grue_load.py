@@ -0,0 +1,409 @@
+# Grue Text Adventure Engine - Load Testing
+#
+# Simulates many players at once and reports how the engine holds up as
+# their number grows: throughput, command latency percentiles, memory per
+# session and CPU time per command. Bots either wander at random, taking
+# the items they find and talking to the characters they meet, or loop
+# over a command script. They play in-process engines by default, or a
+# running grue_server with --connect:
+#
+#     python grue_load.py --game dark_dungeon --players 10,100,1000
+#     python grue_load.py --game dark_dungeon --connect localhost:4000 --server-pid 4242
+#
+# Bots only read the text the game shows them, so the same strategies
+# work against both. Each run is appended to a JSON-lines file, and the
+# report compares it with the last run of the same test, so runs from
+# different versions can be compared.
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import grue_engine
+from grue_bench import git_revision, load_runs
+from grue_engine import GrueEngine
+from grue_multiplayer import SharedWorld
+from grue_registry import GameRegistry
+from grue_replay import percentile, read_script
+
+REGISTRY = GameRegistry()
+
+DEFAULT_PLAYERS = [10, 100, 1000]
+DEFAULT_RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "load.jsonl")
+
+# How a wandering bot picks its next command when it has the choice
+TAKE_CHANCE = 0.3
+TALK_CHANCE = 0.2
+DROP_CHANCE = 0.1
+
+
+def parse_screen(text):
+    """Return (exits, items, characters) named in the text a player was last shown."""
+    exits, items, characters = [], [], []
+    for line in text.splitlines():
+        if line.startswith("Exits: "):
+            exits = line[7:].split(", ")
+        elif line.startswith("You can see a ") and line.endswith(" here."):
+            listed = line[14:-6]
+            first, _, last = listed.rpartition(" and a ")
+            items = (first.split(", ") + [last]) if first else [listed]
+        elif line.startswith("There is ") and line.endswith(" here."):
+            characters.append(line[9:-6])
+    return exits, items, characters
+
+
+class RandomWalk:
+    """A bot that wanders, taking what it finds, talking to who it meets and dropping things now and then."""
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.carrying = []
+
+    def next_command(self, screen):
+        """Return the command to send after being shown a screen of text."""
+        rng = self.random
+        for line in screen.splitlines():
+            if line.startswith("You take the ") and line.endswith("."):
+                self.carrying.append(line[13:-1])
+
+        exits, items, characters = parse_screen(screen)
+        if items and rng.random() < TAKE_CHANCE:
+            return f"take {rng.choice(items).lower()}"
+        if characters and rng.random() < TALK_CHANCE:
+            return f"talk to {rng.choice(characters).lower()}"
+        if self.carrying and rng.random() < DROP_CHANCE:
+            return f"drop {self.carrying.pop(rng.randrange(len(self.carrying))).lower()}"
+        if exits:
+            return f"go {rng.choice(exits)}"
+        return "look"
+
+
+class Scripted:
+    """A bot that sends the commands of a script in order, starting over at the end."""
+
+    def __init__(self, commands, start=0):
+        self.commands = commands
+        self.position = start
+
+    def next_command(self, screen):
+        """Return the next command of the script."""
+        command = self.commands[self.position % len(self.commands)]
+        self.position += 1
+        return command
+
+
+def make_bot(strategy, number, seed=0, script=None):
+    """Return the bot for one simulated player."""
+    if strategy == "script":
+        return Scripted(script, number)
+    return RandomWalk(seed * 1000003 + number)
+
+
+def process_usage(pid=None):
+    """Return (cpu_seconds, resident_bytes) for a process, this one by default.
+
+    Either is None where it cannot be read; resident memory comes from
+    /proc, so it is only known on Linux.
+    """
+    if pid is None:
+        cpu = time.process_time()
+        statm = "/proc/self/statm"
+    else:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, IndexError, ValueError):
+            cpu = None
+        statm = f"/proc/{pid}/statm"
+    try:
+        with open(statm) as f:
+            resident = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        resident = None
+    return cpu, resident
+
+
+def _step_result(players, latencies, elapsed, before, after):
+    """Return the figures for one step of a run from its latencies and process usage."""
+    latencies.sort()
+    commands = len(latencies)
+    cpu = resident = None
+    if before[0] is not None and after[0] is not None and commands:
+        cpu = (after[0] - before[0]) / commands * 1e6
+    if before[1] is not None and after[1] is not None:
+        resident = max(0, after[1] - before[1]) / players
+    return {
+        "players": players,
+        "commands": commands,
+        "elapsed": elapsed,
+        "throughput": commands / elapsed if elapsed > 0 else 0.0,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p95_us": percentile(latencies, 0.95) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "max_us": latencies[-1] * 1e6 if latencies else 0.0,
+        "cpu_per_command_us": cpu,
+        "memory_per_session": resident,
+    }
+
+
+def run_in_process(game_id, players, commands, strategy="random", seed=0, script=None, shared=False):
+    """Play players bots against engines in this process and return the step's figures.
+
+    The bots take turns one command at a time, as sessions do in the
+    server's event loop; with shared, they all play one SharedWorld that
+    ticks once a round. Each command is timed together with the location
+    display that follows it.
+    """
+    game = REGISTRY.load(game_id)
+    gc.collect()
+    before = process_usage()
+
+    world = SharedWorld(game) if shared else None
+    sessions = []
+    for number in range(players):
+        if world is not None:
+            engine = world.join(f"bot{number}", lambda text: None).engine
+        else:
+            engine = GrueEngine()
+            engine.load_game(game)
+        engine.running = True
+        sessions.append([engine, make_bot(strategy, number, seed, script), engine.display_location()])
+
+    latencies = []
+    clock = time.perf_counter
+    cpu = process_usage()[0]
+    started = clock()
+    for _ in range(commands):
+        for session in sessions:
+            engine, bot, screen = session
+            command = bot.next_command(screen)
+            begun = clock()
+            response = engine.process_command(command)
+            session[2] = response + "\n" + engine.display_location()
+            latencies.append(clock() - begun)
+        if world is not None:
+            world.tick()
+    elapsed = clock() - started
+
+    gc.collect()
+    # Memory is measured from before the sessions were created, CPU from when they started playing
+    return _step_result(players, latencies, elapsed, (cpu, before[1]), process_usage())
+
+
+def _shows_location(screen):
+    """Return True if a screen of text ends with a location description, as every answer to a command does."""
+    return any(line.startswith("Exits: ") or line == "There are no obvious exits."
+               for line in screen.splitlines())
+
+
+async def _read_screen(reader, buffer, questions=False):
+    """Read from the server until it has answered the bot, returning the answer.
+
+    In a shared world, messages about other players arrive whenever they
+    happen, each on its own before a fresh prompt, so a prompt alone does
+    not mean the answer has come. Those messages are skipped, and whatever
+    was read past the answer is left in buffer for the next call. With
+    questions, a question asked while logging in also counts as an answer.
+    """
+    while True:
+        end = buffer.find(b"\n> ")
+        while end >= 0:
+            screen = buffer[:end + 3].decode("utf-8", errors="replace")
+            del buffer[:end + 3]
+            if _shows_location(screen):
+                return screen
+            end = buffer.find(b"\n> ")
+        if questions and buffer.endswith(b": "):
+            screen = buffer.decode("utf-8", errors="replace")
+            buffer.clear()
+            return screen
+
+        chunk = await reader.read(65536)
+        if not chunk:
+            raise ConnectionError("the server closed the connection")
+        buffer += chunk
+
+
+async def _play_remote(host, port, title, name, bot, commands, latencies, ready, go):
+    """Connect one bot to the server, get it into the game and play its commands."""
+    reader, writer = await asyncio.open_connection(host, port)
+    buffer = bytearray()
+    try:
+        screen = await _read_screen(reader, buffer, questions=True)
+        while not screen.endswith("> "):
+            if screen.endswith("Select an adventure (number): "):
+                choice = "1"
+                for line in screen.splitlines():
+                    number, _, listed = line.partition(". ")
+                    if listed == title and number.isdigit():
+                        choice = number
+                writer.write(f"{choice}\n".encode("utf-8"))
+            else:
+                writer.write(f"{name}\n".encode("utf-8"))
+            screen = await _read_screen(reader, buffer, questions=True)
+
+        # Every bot gets into the game before the clock starts
+        ready()
+        await go.wait()
+        clock = time.perf_counter
+        for _ in range(commands):
+            command = bot.next_command(screen)
+            started = clock()
+            writer.write(f"{command}\n".encode("utf-8"))
+            screen = await _read_screen(reader, buffer)
+            latencies.append(clock() - started)
+    finally:
+        writer.close()
+
+
+async def _run_remote(host, port, game_id, players, commands, strategy, seed, script, pid):
+    title = REGISTRY.get(game_id)['title']
+    latencies = []
+    go = asyncio.Event()
+    waiting = [players]
+    usage = []
+
+    def server_usage():
+        # Without the server's process ID there is nothing to measure; this process is only the bots
+        return process_usage(pid) if pid is not None else (None, None)
+
+    def ready():
+        waiting[0] -= 1
+        if waiting[0] == 0:
+            usage.append(server_usage())
+            usage.append(time.perf_counter())
+            go.set()
+
+    before = server_usage()
+    await asyncio.gather(*[
+        _play_remote(host, port, title, f"bot{number}-{os.getpid()}", make_bot(strategy, number, seed, script),
+                     commands, latencies, ready, go)
+        for number in range(players)])
+    elapsed = time.perf_counter() - usage[1]
+    after = server_usage()
+
+    # Memory is measured from before the bots connected, CPU from when they were all playing
+    return _step_result(players, latencies, elapsed, (usage[0][0], before[1]), after)
+
+
+def run_against_server(host, port, game_id, players, commands, strategy="random", seed=0, script=None,
+                       pid=None):
+    """Play players bots against a running server at once and return the step's figures.
+
+    The server's CPU time and memory are only reported when its process
+    ID is given and it runs on this machine.
+    """
+    return asyncio.run(_run_remote(host, port, game_id, players, commands, strategy, seed, script, pid))
+
+
+def format_step(step):
+    """Return the printable report lines for one step of a run."""
+    cpu = step["cpu_per_command_us"]
+    memory = step["memory_per_session"]
+    rows = [
+        ("Commands", f"{step['commands']:,}"),
+        ("Throughput", f"{step['throughput']:,.0f} commands/sec"),
+        ("Latency p50", f"{step['p50_us']:,.1f} us"),
+        ("Latency p95", f"{step['p95_us']:,.1f} us"),
+        ("Latency p99", f"{step['p99_us']:,.1f} us"),
+        ("Latency max", f"{step['max_us']:,.1f} us"),
+        ("CPU", "n/a" if cpu is None else f"{cpu:,.1f} us/command"),
+        ("Memory", "n/a" if memory is None else f"{memory / 1024:,.1f} KB/session"),
+    ]
+    return [f"  {label + ':':<15} {value}" for label, value in rows]
+
+
+def compare_runs(run, previous):
+    """Return report lines comparing throughput and p99 latency with an earlier run of the same test.
+
+    Only player counts both runs tried are compared; with none in common
+    there are no lines at all.
+    """
+    lines = []
+    earlier = {step["players"]: step for step in previous["steps"]}
+    for step in run["steps"]:
+        old = earlier.get(step["players"])
+        if old is None:
+            continue
+        lines.append(f"  {step['players']:,} players: {old['throughput']:,.0f} -> {step['throughput']:,.0f} "
+                     f"commands/sec, p99 {old['p99_us']:,.1f} -> {step['p99_us']:,.1f} us")
+    if lines:
+        lines.insert(0, f"Compared with {previous['revision'] or previous['engine_version']} "
+                        f"({previous['timestamp']}):")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many players and report how the Grue engine copes.")
+    parser.add_argument("--game", required=True, choices=REGISTRY.ids(), help="game the bots play")
+    parser.add_argument("--players", default=",".join(str(players) for players in DEFAULT_PLAYERS),
+                        help="comma-separated player counts to ramp through (default: %(default)s)")
+    parser.add_argument("--commands", type=int, default=100, help="commands each bot sends (default: 100)")
+    parser.add_argument("--strategy", choices=["random", "script"], default="random",
+                        help="wander at random or loop over --script (default: random)")
+    parser.add_argument("--script", help="command script for --strategy script, one command per line")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the wandering bots (default: 0)")
+    parser.add_argument("--shared", action="store_true", help="put the in-process bots in one shared world")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="play a running grue_server instead of in-process")
+    parser.add_argument("--server-pid", type=int, help="process ID of the server, to report its CPU and memory")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSON-lines file to append the run to")
+    args = parser.parse_args()
+
+    script = None
+    if args.strategy == "script":
+        if not args.script:
+            parser.error("--strategy script needs --script")
+        script = [command.lower() for command in read_script(args.script)]
+        if not script:
+            parser.error(f"{args.script} has no commands")
+    if args.connect and args.shared:
+        parser.error("--shared only applies to in-process bots; start the server with --shared instead")
+
+    target = args.connect or ("in-process shared" if args.shared else "in-process")
+    run = {
+        "engine_version": grue_engine.__version__,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "game": args.game,
+        "target": target,
+        "strategy": args.strategy if script is None else f"script {os.path.basename(args.script)}",
+        "commands": args.commands,
+        "steps": [],
+    }
+
+    for players in [int(players) for players in args.players.split(",")]:
+        if args.connect:
+            host, _, port = args.connect.rpartition(":")
+            step = run_against_server(host or "127.0.0.1", int(port), args.game, players, args.commands,
+                                      args.strategy, args.seed, script, args.server_pid)
+        else:
+            step = run_in_process(args.game, players, args.commands, args.strategy, args.seed, script,
+                                  args.shared)
+        print(f"{players:,} players")
+        print("\n".join(format_step(step)))
+        run["steps"].append(step)
+
+    # Compare with the latest run of the same test
+    previous_runs = [r for r in load_runs(args.results)
+                     if all(r.get(key) == run[key] for key in ("game", "target", "strategy", "commands"))]
+    comparison = compare_runs(run, previous_runs[-1]) if previous_runs else []
+    if comparison:
+        print()
+        print("\n".join(comparison))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
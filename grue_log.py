@@ -0,0 +1,148 @@
+# Grue Text Adventure Engine - Columnar Command Logs
+#
+# Records every command of any number of sessions as one row of small
+# integers, stored column by column so analytics (see grue_analytics) can
+# load millions of rows straight into arrays:
+#
+#     log = CommandLog("logs/dark_dungeon", engine.world, "dark_dungeon")
+#     engine.command_log = log.session()
+#     ...
+#     log.close()
+#
+# A log is a directory holding one raw binary file per column, in native
+# byte order, and meta.json describing them. Each row holds:
+#
+#     session      int32  which session ran the command, numbered from 0
+#     time         int64  when it ran, in microseconds since the epoch
+#     verb         int16  the command's verb, an index into meta["verbs"]; 0 if not understood
+#     source       int32  the location the player was in before the command
+#     destination  int32  the location the player was in after it
+#     item         int32  the item the command picked up, or -1
+#
+# Locations and items are the world's indexes. Rows are buffered and
+# appended to the column files every FLUSH_ROWS rows, or with the next
+# command once FLUSH_INTERVAL seconds have passed, so logging costs a few
+# array appends per command. Reopening a log carries on where it stopped;
+# a crash can lose the buffered rows, and readers ignore any trailing rows
+# that did not reach every column.
+
+import json
+import os
+import sys
+import time
+from array import array
+
+# Column names with the array typecode each is stored as
+COLUMNS = (
+    ("session", "i"),
+    ("time", "q"),
+    ("verb", "h"),
+    ("source", "i"),
+    ("destination", "i"),
+    ("item", "i"),
+)
+
+# Rows buffered before they are appended to the column files
+FLUSH_ROWS = 4096
+
+# Seconds rows may stay buffered before the next command flushes them
+FLUSH_INTERVAL = 10.0
+
+NOT_UNDERSTOOD = "(not understood)"
+
+
+class CommandLog:
+    """The command log of one world, shared by every session that writes to it."""
+
+    META = "meta.json"
+
+    def __init__(self, directory, world, game=None, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._next_flush = time.time() + flush_interval
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self.meta = {
+            "game": game,
+            "fingerprint": world.fingerprint().hex(),
+            "byteorder": sys.byteorder,
+            "columns": {name: f"i{array(typecode).itemsize}" for name, typecode in COLUMNS},  # NumPy dtypes
+            "locations": len(world.locations),
+            "items": len(world.items),
+            "sessions": 0,
+            "rows": 0,
+            "verbs": [NOT_UNDERSTOOD],
+        }
+
+        path = os.path.join(directory, self.META)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                existing = json.load(f)
+            if existing["fingerprint"] != self.meta["fingerprint"] or existing["byteorder"] != sys.byteorder:
+                raise ValueError(f"{directory} holds a log of a different world or machine")
+            self.meta = existing
+        self.verb_codes = {verb: code for code, verb in enumerate(self.meta["verbs"])}
+
+    def session(self):
+        """Start logging a new session and return the SessionLog to attach to its engine."""
+        number = self.meta["sessions"]
+        self.meta["sessions"] = number + 1
+        return SessionLog(self, number)
+
+    def record(self, session, verb, source, destination, item=-1):
+        """Add one row for a command; verb is the command's name, or None if it was not understood."""
+        verb = verb or NOT_UNDERSTOOD
+        code = self.verb_codes.get(verb)
+        if code is None:
+            code = self.verb_codes[verb] = len(self.meta["verbs"])
+            self.meta["verbs"].append(verb)
+
+        now = time.time()
+        columns = self.columns
+        columns["session"].append(session)
+        columns["time"].append(int(now * 1e6))
+        columns["verb"].append(code)
+        columns["source"].append(source)
+        columns["destination"].append(destination)
+        columns["item"].append(item)
+        if len(columns["session"]) >= self.flush_rows or now >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the column files and rewrite meta.json."""
+        self._next_flush = time.time() + self.flush_interval
+        os.makedirs(self.directory, exist_ok=True)
+        rows = len(self.columns["session"])
+        for name, values in self.columns.items():
+            if values:
+                with open(os.path.join(self.directory, name), "ab") as f:
+                    values.tofile(f)
+                del values[:]
+        self.meta["rows"] += rows
+
+        path = os.path.join(self.directory, self.META)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        """Write out everything buffered."""
+        self.flush()
+
+
+class SessionLog:
+    """One session's handle on a CommandLog; attach it to an engine as GrueEngine.command_log."""
+
+    __slots__ = ('log', 'session')
+
+    def __init__(self, log, session):
+        self.log = log
+        self.session = session
+
+    def record(self, verb, source, destination, item=-1):
+        """Add one row for a command this session ran."""
+        self.log.record(self.session, verb, source, destination, item)
+
+    def close(self):
+        """Write out the log's buffered rows, so a finished session is on disk."""
+        self.log.flush()
@@ -0,0 +1,276 @@
+# Grue Text Adventure Engine - Opt-In Instrumentation
+#
+# Counts how often each verb is used and how long it takes, along with the
+# time spent rendering locations, resolving names and moving, for the
+# sessions it is attached to. Nothing is wrapped until instrument() is
+# called on an engine, so other sessions run exactly the code they would
+# without it:
+#
+#     metrics = Metrics("metrics.txt", interval=60)
+#     instrument(engine, metrics)     # after engine.load_game
+#
+# An instrumented session also answers a hidden "stats" command, and hooks
+# can be attached to it to run a profiler around its commands alone.
+
+import os
+import time
+
+from grue_commands import Command
+from grue_engine import GrueEngine
+
+# Histogram bucket n counts durations of under 2**n microseconds
+HISTOGRAM_BUCKETS = 40
+
+
+class Histogram:
+    """Durations counted in power-of-two microsecond buckets."""
+
+    __slots__ = ('count', 'total', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, seconds):
+        """Count one duration."""
+        self.count += 1
+        self.total += seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Return the upper edge of the bucket holding a percentile, in seconds."""
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return (1 << bucket) / 1e6
+        return 0.0
+
+
+class Metrics:
+    """Counters and histograms shared by every session instrumented with them.
+
+    If a path is given, the report is rewritten there at most every
+    interval seconds, checked as commands complete, and on flush().
+    """
+
+    def __init__(self, path=None, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self.verbs = {}
+        self.sections = {}
+        self.started = time.monotonic()
+        self._next_flush = self.started + interval
+
+    def record_verb(self, verb, seconds):
+        """Count one use of a verb and how long it took."""
+        histogram = self.verbs.get(verb)
+        if histogram is None:
+            histogram = self.verbs[verb] = Histogram()
+        histogram.add(seconds)
+
+    def record(self, section, seconds):
+        """Add time spent in a section of the engine, such as display_location."""
+        histogram = self.sections.get(section)
+        if histogram is None:
+            histogram = self.sections[section] = Histogram()
+        histogram.add(seconds)
+
+    def command_done(self):
+        """Flush the report if it is due."""
+        if self.path is not None and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Write the report to the metrics file now."""
+        self._next_flush = time.monotonic() + self.interval
+        if self.path is None:
+            return
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.report() + "\n")
+        os.replace(self.path + ".tmp", self.path)
+
+    def report(self):
+        """Return the counts and latencies recorded so far as text."""
+        lines = [
+            f"{'Commands:':<15} {sum(h.count for h in self.verbs.values()):,}",
+            f"{'Uptime:':<15} {time.monotonic() - self.started:,.0f}s",
+        ]
+        for title, table in [("Verb", self.verbs), ("Section", self.sections)]:
+            lines.append("")
+            lines.append(f"{title:<20}{'Count':>10}{'Mean':>12}{'p50':>12}{'p95':>12}{'p99':>12}")
+            for name, histogram in sorted(table.items()):
+                mean = histogram.total / histogram.count
+                columns = [mean] + [histogram.percentile(f) for f in (0.50, 0.95, 0.99)]
+                lines.append(f"{name:<20}{histogram.count:>10,}"
+                             + "".join(f"{seconds * 1e6:>9,.1f} us" for seconds in columns))
+        return "\n".join(lines)
+
+
+class ProfilerHook:
+    """Runs a profiler only while one session's commands execute.
+
+    start and stop are the profiler's own calls, such as the enable and
+    disable methods of a cProfile.Profile.
+    """
+
+    def __init__(self, start, stop):
+        self.start = start
+        self.stop = stop
+
+    def before_command(self, engine, command):
+        self.start()
+
+    def after_command(self, engine, command, response):
+        self.stop()
+
+
+class _TimedNames:
+    """A name index that records how long each lookup takes."""
+
+    __slots__ = ('names', 'metrics')
+
+    def __init__(self, names, metrics):
+        self.names = names
+        self.metrics = metrics
+
+    def find(self, text, *scopes):
+        started = time.perf_counter()
+        try:
+            return self.names.find(text, *scopes)
+        finally:
+            self.metrics.record("resolve_name", time.perf_counter() - started)
+
+    def find_any(self, text):
+        started = time.perf_counter()
+        try:
+            return self.names.find_any(text)
+        finally:
+            self.metrics.record("resolve_name", time.perf_counter() - started)
+
+
+def _move(engine, direction):
+    """Command handler that moves through the engine, so a timed move_player is used."""
+    return engine.move_player(direction)
+
+
+# Engine attributes instrument() replaces on the instance
+_WRAPPED = ('process_command', 'display_location', 'move_player',
+            'commands', 'item_names', 'character_names', 'location_names')
+
+
+class Instrumentation:
+    """The wrappers instrument() put on one engine, and the hooks attached to it."""
+
+    def __init__(self, engine, metrics):
+        self.engine = engine
+        self.metrics = metrics
+        self.hooks = []
+        self._saved = {}
+        self._process = None
+        self._handled = False
+
+    def add_hook(self, hook):
+        """Run a hook around each of this session's commands.
+
+        The hook's before_command(engine, command) is called before the
+        command and after_command(engine, command, response) after it.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Stop calling a hook."""
+        self.hooks.remove(hook)
+
+    def _timed(self, section, func):
+        metrics = self.metrics
+        clock = time.perf_counter
+
+        def timed(*args):
+            started = clock()
+            try:
+                return func(*args)
+            finally:
+                metrics.record(section, clock() - started)
+        return timed
+
+    def _timed_verb(self, verb, handler):
+        metrics = self.metrics
+        clock = time.perf_counter
+
+        def timed(engine, *argument):
+            self._handled = True
+            started = clock()
+            try:
+                return handler(engine, *argument)
+            finally:
+                metrics.record_verb(verb, clock() - started)
+        return timed
+
+    def _process_command(self, command):
+        engine = self.engine
+        for hook in self.hooks:
+            hook.before_command(engine, command)
+        self._handled = False
+        started = time.perf_counter()
+        response = self._process(command)
+        elapsed = time.perf_counter() - started
+        if not self._handled:
+            self.metrics.record_verb("(not understood)", elapsed)
+        self.metrics.record("process_command", elapsed)
+        for hook in self.hooks:
+            hook.after_command(engine, command, response)
+        self.metrics.command_done()
+        return response
+
+    def _show_stats(self, engine):
+        return self.metrics.report()
+
+    def attach(self):
+        """Put the timing wrappers on the engine."""
+        engine = self.engine
+        self._saved = {name: vars(engine)[name] for name in _WRAPPED if name in vars(engine)}
+        self._process = engine.process_command
+
+        engine.process_command = self._process_command
+        engine.display_location = self._timed("display_location", engine.display_location)
+        engine.move_player = self._timed("move_player", engine.move_player)
+        for name in ('item_names', 'character_names', 'location_names'):
+            setattr(engine, name, _TimedNames(getattr(engine, name), self.metrics))
+
+        # Every command gets a timed copy, shared by its aliases and recorded under its name;
+        # "stats" is added but not listed in the help
+        table = engine.commands.copy()
+        table.register("stats", self._show_stats)
+        timed = {}
+        for verb, command in table.verbs.items():
+            if command not in timed:
+                handler = _move if command.handler is GrueEngine.move_player else command.handler
+                timed[command] = Command(self._timed_verb(command.name, handler), command.takes_argument,
+                                         command.argument, command.name, command.rest_of_line,
+                                         command.optional)
+            table.verbs[verb] = timed[command]
+        engine.commands = table
+
+    def detach(self):
+        """Remove the wrappers, leaving the engine as it was before instrument()."""
+        attributes = vars(self.engine)
+        for name in _WRAPPED:
+            if name in self._saved:
+                attributes[name] = self._saved[name]
+            else:
+                attributes.pop(name, None)
+        self._saved = {}
+        self._process = None
+
+
+def instrument(engine, metrics):
+    """Start recording an engine's commands into metrics and return its Instrumentation.
+
+    Call it after load_game, which resets the engine's command table.
+    """
+    instrumentation = Instrumentation(engine, metrics)
+    instrumentation.attach()
+    return instrumentation
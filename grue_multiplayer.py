@@ -0,0 +1,208 @@
+# Grue Text Adventure Engine - Shared Worlds
+#
+# Lets many players inhabit one instance of a game: items one player takes
+# are gone for everyone, and players see each other come and go. Each
+# player has their own engine and PlayerState over a single WorldState.
+#
+#     shared = SharedWorld(game_module)
+#     player = shared.join("alice", deliver)   # deliver(text) sends to the client
+#     player.engine.process_command("take key")
+#     shared.tick()                            # a few times a second
+#
+# An index from each location to the players in it makes "who is here"
+# and arrival notices cost O(players in the room), however many are
+# online. Messages for a room are queued and delivered once per tick, all
+# of a room's messages together, so a busy hub sends each occupant one
+# write per tick rather than one per event. Commands run one at a time
+# (the server runs every session in one event loop), so players racing
+# for an item need no locks: whichever command runs first gets it.
+
+from grue_engine import GrueEngine
+from grue_state import WorldState
+from grue_world import load_world
+
+# Rooms with more players than this show a head count instead of names
+PRESENCE_NAMES = 8
+
+# Ticks between turns of the characters that move on their own
+TICKS_PER_TURN = 8
+
+
+class SharedPlayer:
+    """One player in a shared world: their name, engine and where their messages go.
+
+    arrived is the tick the player last entered a room during and how many
+    messages were already queued for it, which they were not there to see.
+    """
+
+    __slots__ = ('shared', 'name', 'engine', 'deliver', 'arrived')
+
+    def __init__(self, shared, name, engine, deliver):
+        self.shared = shared
+        self.name = name
+        self.engine = engine
+        self.deliver = deliver
+        self.arrived = (-1, 0)
+
+    @property
+    def location(self):
+        """The location the player is in."""
+        return self.engine.player.current_location
+
+    def announce(self, text):
+        """Tell everyone else in the player's location."""
+        self.shared.broadcast(self.location, text, self)
+
+    def moved(self, source, destination, direction):
+        """Update the occupancy index and tell both rooms; called by the engine after a move."""
+        shared = self.shared
+        shared._leave_room(self, source)
+        shared._enter_room(self, destination)
+        shared.broadcast(source, f"{self.name} leaves {direction}.", self)
+
+        # Name the way they came in, if there is an exit leading back
+        state = shared.state
+        for back in state.exits_at(destination):
+            if state.exit_target(destination, back) == source:
+                shared.broadcast(destination, f"{self.name} arrives from the {shared.world.directions[back]}.", self)
+                break
+        else:
+            shared.broadcast(destination, f"{self.name} arrives.", self)
+
+    def others_here(self):
+        """Return the other players in the player's location."""
+        return [player for player in self.shared.occupants.get(self.location, ()) if player is not self]
+
+    def presence(self):
+        """Return the line listing the other players here, or an empty string if there are none."""
+        occupants = self.shared.occupants.get(self.location, ())
+        count = len(occupants) - 1
+        if count <= 0:
+            return ""
+        if count > PRESENCE_NAMES:
+            return f"\nThere are {count} other adventurers here."
+        names = [player.name for player in occupants if player is not self]
+        if count == 1:
+            return f"\n{names[0]} is here."
+        return f"\n{', '.join(names[:-1])} and {names[-1]} are here."
+
+
+def _who(engine):
+    """List the players in the current location."""
+    others = engine.shared.others_here()
+    if not others:
+        return "There is nobody else here."
+    if len(others) > PRESENCE_NAMES:
+        return f"There are {len(others)} other adventurers here."
+    return "Here with you: " + ", ".join(player.name for player in others) + "."
+
+
+def _say(engine, text):
+    """Say something to everyone in the current location."""
+    engine.shared.announce(f"{engine.shared.name} says, \"{text}\"")
+    return f"You say, \"{text}\""
+
+
+class SharedWorld:
+    """One instance of a game that many players share.
+
+    occupants maps each location to its players, in the order they came
+    in, as a dict used as an ordered set; pending holds the messages for
+    each location not yet delivered, as (text, author) pairs.
+    """
+
+    def __init__(self, game_module, ticks_per_turn=TICKS_PER_TURN):
+        self.game = game_module
+        self.world = load_world(game_module)
+        self.state = WorldState(self.world)
+        self.ticks_per_turn = ticks_per_turn
+        self.players = {}    # Name -> SharedPlayer
+        self.occupants = {}  # Location -> {SharedPlayer: None}
+        self.pending = {}    # Location -> [(text, SharedPlayer or None)]
+        self.ticks = 0
+        self.commands = None
+
+    def _enter_room(self, player, location):
+        room = self.occupants.get(location)
+        if room is None:
+            room = self.occupants[location] = {}
+        room[player] = None
+        player.arrived = (self.ticks, len(self.pending.get(location, ())))
+
+    def _leave_room(self, player, location):
+        room = self.occupants[location]
+        del room[player]
+        if not room:
+            del self.occupants[location]
+
+    def join(self, name, deliver):
+        """Add a player and return their SharedPlayer, or None if the name is taken.
+
+        deliver(text) is called with the messages meant for them.
+        """
+        if name in self.players:
+            return None
+        engine = GrueEngine()
+        engine.load_game(self.game)
+        engine.state = self.state
+        if self.commands is None:
+            self.commands = engine.commands.copy()
+            self.commands.register("who", _who, usage="who", description="See who else is here")
+            self.commands.register("say", _say, rest_of_line=True,
+                                   usage="say [words]", description="Say something to everyone here")
+        engine.commands = self.commands
+
+        player = SharedPlayer(self, name, engine, deliver)
+        engine.shared = player
+        self.players[name] = player
+        self._enter_room(player, player.location)
+        self.broadcast(player.location, f"{name} appears.", player)
+        return player
+
+    def leave(self, player):
+        """Remove a player, leaving whatever they carried where they stood."""
+        location = player.location
+        player_state = player.engine.player
+        for item in list(player_state.inventory):
+            player_state.put_down(item, self.world.items[item].weight)
+            self.state.add_item(location, item)
+        self._leave_room(player, location)
+        del self.players[player.name]
+        self.broadcast(location, f"{player.name} vanishes.")
+
+    def broadcast(self, location, text, author=None):
+        """Queue a message for everyone in a location (except its author) until the next tick."""
+        if location in self.occupants:
+            messages = self.pending.get(location)
+            if messages is None:
+                messages = self.pending[location] = []
+            messages.append((text, author))
+
+    def tick(self):
+        """Give the moving characters their turn when due, then deliver every queued message.
+
+        Players only get the messages queued after they entered the room.
+        """
+        queued_during = self.ticks
+        self.ticks += 1
+        schedule = self.state.schedule
+        if schedule is not None and self.ticks % self.ticks_per_turn == 0:
+            for location, text in schedule.advance(self.state, self.occupants):
+                self.broadcast(location, text)
+
+        pending, self.pending = self.pending, {}
+        for location, messages in pending.items():
+            occupants = self.occupants.get(location)
+            if not occupants:
+                continue
+            everyone = "\n".join(text for text, _ in messages)
+            authors = {author for _, author in messages if author is not None}
+            for player in occupants:
+                missed = player.arrived[1] if player.arrived[0] == queued_during else 0
+                if missed or player in authors:
+                    # Authors get the room's messages without their own, late arrivals without earlier ones
+                    text = "\n".join(text for text, author in messages[missed:] if author is not player)
+                    if text:
+                        player.deliver(text)
+                else:
+                    player.deliver(everyone)
@@ -0,0 +1,243 @@
+# Grue Text Adventure Engine - NPC Scheduler
+#
+# Characters can move on their own, one step every few game ticks (a tick
+# is one command). Their behaviour comes from their properties:
+#
+#     "properties": {"wander": 3, "territory": ["guard_room", "dungeon_hall"]}
+#     "properties": {"patrol": ["gate", "yard", "tower"], "patrol_every": 2}
+#
+# A wanderer takes a random exit every `wander` ticks, staying within its
+# territory if it has one; a patroller moves to the next location of its
+# patrol, looping back to the first.
+#
+# Each world state keeps a heap of when each character acts next, so a tick
+# only touches the characters due to act. Characters due while far from
+# every player (more than ACTIVE_RADIUS moves away) fall asleep where they
+# are instead, and are caught up on the steps they missed once a player
+# comes near. Every random choice is derived from the character and the
+# step number, so a session replays the same way every time and a caught
+# up character ends where it would have been anyway (for wanderers, as of
+# the last CATCH_UP_LIMIT steps).
+
+import heapq
+
+# Characters this many moves or fewer from the player act when due
+ACTIVE_RADIUS = 2
+
+# Most missed steps a wanderer replays when it wakes up
+CATCH_UP_LIMIT = 20
+
+_MASK = (1 << 64) - 1
+
+
+def _mix(character, step):
+    """Return a well-scrambled 64-bit number for a character's step (splitmix64)."""
+    x = (character * 0x9E3779B97F4A7C15 + step) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+class Behaviour:
+    """How one character moves: kind is "wander" or "patrol".
+
+    places is the territory of a wanderer (empty for anywhere) or the
+    route of a patroller, as location indexes.
+    """
+
+    __slots__ = ('character', 'kind', 'every', 'places', 'home', 'phase')
+
+    def __init__(self, character, kind, every, places, home):
+        self.character = character
+        self.kind = kind
+        self.every = every
+        self.places = frozenset(places) if kind == "wander" else tuple(places)
+        self.home = home
+        self.phase = character % every  # Spreads characters with the same period over different ticks
+
+    def to_list(self):
+        """Return the behaviour as a JSON-compatible list of constructor arguments."""
+        places = sorted(self.places) if self.kind == "wander" else list(self.places)
+        return [self.character, self.kind, self.every, places, self.home]
+
+    def step_at(self, tick):
+        """Return how many steps the character has taken by a tick."""
+        return (tick + self.phase) // self.every
+
+    def due_after(self, tick):
+        """Return the first tick after the given one at which the character acts."""
+        return (self.step_at(tick) + 1) * self.every - self.phase
+
+    def destination(self, state, location, step):
+        """Return where the character goes on a step from a location (possibly where it is)."""
+        if self.kind == "patrol":
+            return self.places[step % len(self.places)]
+        targets = [state.exit_target(location, direction) for direction in state.exits_at(location)]
+        if self.places:
+            targets = [target for target in targets if target in self.places]
+        if not targets:
+            return location
+        return targets[_mix(self.character, step) % len(targets)]
+
+
+def compile_behaviours(world, characters):
+    """Return {character index: Behaviour} for the characters of a game table that move."""
+    homes = {}
+    for location in world.locations:
+        for character in location.characters:
+            homes.setdefault(character, location.index)
+
+    behaviours = {}
+    for index, (char_id, data) in enumerate(characters.items()):
+        properties = data['properties']
+        if 'patrol' in properties:
+            kind, every, places = "patrol", properties.get('patrol_every', 1), properties['patrol']
+        elif 'wander' in properties:
+            kind, every, places = "wander", properties['wander'], properties.get('territory', ())
+        else:
+            continue
+        if index not in homes:
+            raise ValueError(f"Character '{char_id}' moves but is not placed in any location")
+        if not places and kind == "patrol":
+            raise ValueError(f"Character '{char_id}' has an empty patrol")
+        places = [world.location_index[place] if place in world.location_index else None for place in places]
+        if None in places:
+            raise ValueError(f"Character '{char_id}' refers to an unknown location")
+        behaviours[index] = Behaviour(index, kind, every, places, homes[index])
+    return behaviours
+
+
+class Schedule:
+    """When each moving character of one session acts next, and where it is.
+
+    Characters that are awake wait in a heap of (tick, character); those
+    asleep are listed by the location they fell asleep in, with the step
+    they had reached. Changes to where, asleep and sleeping_at are listed
+    in the world state's journal while a history is kept; the heap always
+    follows from the tick and who is asleep, so it is rebuilt instead.
+    """
+
+    __slots__ = ('behaviours', 'tick', 'where', 'heap', 'asleep', 'sleeping_at')
+
+    # Tables whose changes go in the world state's journal
+    JOURNALED = ('where', 'asleep', 'sleeping_at')
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.tick = 0
+        self.where = {character: behaviour.home for character, behaviour in behaviours.items()}
+        self.heap = [(behaviour.due_after(0), character) for character, behaviour in behaviours.items()]
+        heapq.heapify(self.heap)
+        self.asleep = {}       # Character -> steps taken when it fell asleep
+        self.sleeping_at = {}  # Location -> characters asleep there
+
+    def copy(self):
+        """Return an independent copy of the schedule."""
+        schedule = Schedule.__new__(Schedule)
+        schedule.behaviours = self.behaviours
+        schedule.tick = self.tick
+        schedule.where = dict(self.where)
+        schedule.heap = list(self.heap)
+        schedule.asleep = dict(self.asleep)
+        schedule.sleeping_at = {location: list(characters) for location, characters in self.sleeping_at.items()}
+        return schedule
+
+    def restore(self, state, tick, asleep):
+        """Set the schedule to a saved tick, given the session's overlays and the sleepers' steps."""
+        for location, characters in state.location_characters.items():
+            for character in characters:
+                if character in self.behaviours:
+                    self.where[character] = location
+        self.tick = tick
+        self.asleep = dict(asleep)
+        self.sleeping_at = {}
+        for character in self.asleep:
+            self.sleeping_at.setdefault(self.where[character], []).append(character)
+        self.reschedule()
+
+    def reschedule(self):
+        """Rebuild the heap of when each character that is awake acts next, as of the current tick."""
+        self.heap = [(behaviour.due_after(self.tick), character) for character, behaviour in self.behaviours.items()
+                     if character not in self.asleep]
+        heapq.heapify(self.heap)
+
+    def _area(self, state, locations):
+        """Return the locations within ACTIVE_RADIUS moves of any of the given locations."""
+        area = set(locations)
+        frontier = list(area)
+        for _ in range(ACTIVE_RADIUS):
+            reached = []
+            for source in frontier:
+                for direction in state.exits_at(source):
+                    target = state.exit_target(source, direction)
+                    if target not in area:
+                        area.add(target)
+                        reached.append(target)
+            frontier = reached
+        return area
+
+    def _move(self, state, character, destination, watched, news):
+        """Move a character, adding (location, text) to news where a player sees it come or go."""
+        source = self.where[character]
+        if destination == source:
+            return
+        state.move_character(character, source, destination)
+        state.remember('where', character, source)
+        self.where[character] = destination
+        name = state.world.characters[character].name
+        if source in watched:
+            news.append((source, f"{name} leaves."))
+        if destination in watched:
+            news.append((destination, f"{name} arrives."))
+
+    def _wake(self, state, character, watched, news):
+        """Catch a sleeping character up on the steps it missed and put it back in the heap."""
+        behaviour = self.behaviours[character]
+        done = self.asleep.pop(character)
+        state.remember('asleep', character, done)
+        step = behaviour.step_at(self.tick)
+        if step > done:
+            if behaviour.kind == "patrol":
+                destination = behaviour.destination(state, self.where[character], step)
+            else:
+                destination = self.where[character]
+                for missed in range(max(done, step - CATCH_UP_LIMIT) + 1, step + 1):
+                    destination = behaviour.destination(state, destination, missed)
+            self._move(state, character, destination, watched, news)
+        heapq.heappush(self.heap, (behaviour.due_after(self.tick), character))
+
+    def advance(self, state, watched):
+        """Run one tick and return (location, text) for what players in the watched locations saw happen.
+
+        watched is a collection of the locations players are in; characters
+        near any of them are active.
+        """
+        self.tick += 1
+        news = []
+        area = self._area(state, watched)
+
+        if self.sleeping_at:
+            for location in area:
+                sleepers = self.sleeping_at.pop(location, None)
+                if sleepers is not None:
+                    state.remember('sleeping_at', location, sleepers)
+                    for character in sleepers:
+                        self._wake(state, character, watched, news)
+
+        heap = self.heap
+        while heap and heap[0][0] <= self.tick:
+            _, character = heapq.heappop(heap)
+            behaviour = self.behaviours[character]
+            location = self.where[character]
+            step = behaviour.step_at(self.tick)
+            if location not in area:
+                state.remember('asleep', character, None)
+                self.asleep[character] = step - 1
+                sleepers = self.sleeping_at.get(location)
+                if state.remember('sleeping_at', location, sleepers) or sleepers is None:
+                    sleepers = self.sleeping_at[location] = list(sleepers or ())
+                sleepers.append(character)
+                continue
+            self._move(state, character, behaviour.destination(state, location, step), watched, news)
+            heapq.heappush(heap, (behaviour.due_after(self.tick), character))
+        return news
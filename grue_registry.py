@@ -0,0 +1,173 @@
+# Grue Text Adventure Engine - Game Registry
+#
+# Finds the games installed in a directory and reads their game_info
+# without importing them. What it learns is kept in a manifest file next
+# to the games and only re-read for files whose size or modification
+# time has changed, so the menu appears quickly however many (or however
+# large) the installed games are. A game is only imported once selected.
+#
+# Games are either Python modules or JSON data files (see grue_datafile);
+# when both exist with the same name, the module wins.
+
+import ast
+import importlib.util
+import json
+import os
+import re
+
+GAMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "games")
+MANIFEST_NAME = ".grue_manifest.json"
+MANIFEST_VERSION = 1
+
+# Top-level assignments every game module makes
+_GAME_INFO_RE = re.compile(rb"^game_info\s*=", re.MULTILINE)
+_LOCATIONS_RE = re.compile(rb"^locations\s*=", re.MULTILINE)
+
+# Game modules imported so far, keyed by path, shared by every registry
+_loaded_modules = {}
+
+
+def read_data_game_info(path):
+    """Return the game_info dictionary of a JSON data file, or None if it is not a game."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or "locations" not in data or not isinstance(data.get("game_info"), dict):
+        return None
+    return data["game_info"]
+
+
+def read_game_info(path):
+    """Return the game_info dictionary of a game module without importing it, or None.
+
+    Only the source from the game_info assignment onwards is parsed when
+    possible, which avoids parsing a large world just to read its title.
+    """
+    with open(path, "rb") as f:
+        source = f.read()
+
+    match = _GAME_INFO_RE.search(source)
+    if match is None or _LOCATIONS_RE.search(source) is None:
+        return None
+
+    for candidate in (source[match.start():], source):
+        try:
+            tree = ast.parse(candidate)
+        except SyntaxError:
+            continue
+        for node in tree.body:
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name) and node.targets[0].id == "game_info"):
+                try:
+                    return ast.literal_eval(node.value)
+                except (ValueError, TypeError, SyntaxError):
+                    return None
+    return None
+
+
+class GameRegistry:
+    """The games installed in a directory, loaded only when asked for."""
+
+    def __init__(self, directory=GAMES_DIR, manifest_path=None):
+        self.directory = directory
+        self.manifest_path = manifest_path or os.path.join(directory, MANIFEST_NAME)
+        self._games = None
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest.get("files", {})
+
+    def _save_manifest(self, files):
+        data = {"version": MANIFEST_VERSION, "files": files}
+        try:
+            with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        except OSError:
+            pass  # A read-only games directory just means no cache
+
+    def scan(self):
+        """Find every game in the directory, refreshing the manifest where files changed."""
+        cached = self._load_manifest()
+        files = {}
+        games = {}
+
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            names = []
+
+        for name in names:
+            game_id, extension = os.path.splitext(name)
+            if extension not in (".py", ".json") or name.startswith(("_", ".")):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+
+            entry = cached.get(name)
+            if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                reader = read_game_info if extension == ".py" else read_data_game_info
+                entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "info": reader(path)}
+            files[name] = entry
+
+            info = entry["info"]
+            if info is not None and not (extension == ".json" and game_id in games):
+                games[game_id] = {
+                    "id": game_id,
+                    "title": info.get("title", game_id),
+                    "description": info.get("description", ""),
+                    "author": info.get("author", ""),
+                    "version": info.get("version", ""),
+                    "path": path,
+                }
+
+        if files != cached:
+            self._save_manifest(files)
+        self._games = games
+        return games
+
+    def games(self):
+        """Return the metadata of every installed game, sorted by title."""
+        if self._games is None:
+            self.scan()
+        return sorted(self._games.values(), key=lambda game: game["title"].lower())
+
+    def ids(self):
+        """Return the IDs of every installed game."""
+        return [game["id"] for game in self.games()]
+
+    def get(self, game_id):
+        """Return the metadata of one game, or None if it is not installed."""
+        if self._games is None:
+            self.scan()
+        return self._games.get(game_id)
+
+    def load(self, game_id):
+        """Import a game's module the first time it is needed and return it.
+
+        Data-file games are returned as their (memory-mapped) World, which
+        GrueEngine.load_game accepts in place of a module.
+        """
+        game = self.get(game_id)
+        if game is None:
+            raise KeyError(f"No game named '{game_id}' in {self.directory}")
+
+        if game["path"].endswith(".json"):
+            from grue_datafile import load_data_world
+            return load_data_world(game["path"])
+
+        module = _loaded_modules.get(game["path"])
+        if module is None:
+            spec = importlib.util.spec_from_file_location(game_id, game["path"])
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _loaded_modules[game["path"]] = module
+        return module
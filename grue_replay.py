@@ -0,0 +1,122 @@
+# Grue Text Adventure Engine - Headless Batch Replay
+#
+# Feeds command scripts (one player input per line; blank lines and lines
+# starting with '#' are ignored) through the engine without a terminal,
+# optionally writing a transcript per script, and reports throughput and
+# per-command latency. For example:
+#
+#     python grue_replay.py --game dark_dungeon walkthroughs/*.txt --transcripts out/ --workers 4
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from grue_engine import GrueEngine
+from grue_registry import GameRegistry
+
+REGISTRY = GameRegistry()
+
+
+def read_script(path):
+    """Return the commands in a script file."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def replay_script(game_id, script_path, transcript_dir=None):
+    """Play one script through a fresh engine and return its timings.
+
+    Each command is timed together with the location display that follows
+    it, as that is what one turn of the interactive loop costs.
+    """
+    commands = read_script(script_path)
+    engine = GrueEngine()
+    engine.load_game(REGISTRY.load(game_id))
+    engine.running = True
+
+    transcript = None
+    if transcript_dir:
+        name = os.path.splitext(os.path.basename(script_path))[0] + ".log"
+        transcript = open(os.path.join(transcript_dir, name), "w", encoding="utf-8")
+
+    latencies = []
+    clock = time.perf_counter
+    try:
+        if transcript:
+            transcript.write(engine.display_intro() + "\n")
+            transcript.write(engine.display_location() + "\n")
+
+        for command in commands:
+            started = clock()
+            response = engine.process_line(command.lower())
+            location = engine.display_location()
+            latencies.append(clock() - started)
+
+            if transcript:
+                transcript.write(f"> {command}\n{response}\n{location}\n")
+            if not engine.running:
+                break
+    finally:
+        if transcript:
+            transcript.close()
+
+    return {"script": script_path, "commands": len(latencies), "latencies": latencies}
+
+
+def percentile(sorted_values, fraction):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(results, elapsed):
+    """Return a printable report of throughput and latency over all results."""
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    total = len(latencies)
+    rate = total / elapsed if elapsed > 0 else 0.0
+
+    rows = [
+        ("Scripts", f"{len(results)}"),
+        ("Commands", f"{total}"),
+        ("Elapsed", f"{elapsed:.3f}s"),
+        ("Throughput", f"{rate:,.0f} commands/sec"),
+    ]
+    for label, fraction in [("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("p99.9", 0.999)]:
+        rows.append((f"Latency {label}", f"{percentile(latencies, fraction) * 1e6:,.1f} us"))
+    if latencies:
+        rows.append(("Latency max", f"{latencies[-1] * 1e6:,.1f} us"))
+
+    lines = [f"{label + ':':<15} {value}" for label, value in rows]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay command scripts through the Grue engine.")
+    parser.add_argument("scripts", nargs="+", help="command script files, one command per line")
+    parser.add_argument("--game", required=True, choices=REGISTRY.ids(), help="game to play the scripts against")
+    parser.add_argument("--transcripts", metavar="DIR", help="write a transcript for each script to this directory")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    args = parser.parse_args()
+
+    if args.transcripts:
+        os.makedirs(args.transcripts, exist_ok=True)
+
+    started = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            jobs = [pool.submit(replay_script, args.game, path, args.transcripts) for path in args.scripts]
+            results = [job.result() for job in jobs]
+    else:
+        results = [replay_script(args.game, path, args.transcripts) for path in args.scripts]
+    elapsed = time.perf_counter() - started
+
+    print(summarize(results, elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+# Grue Text Adventure Engine - Route Finding
+#
+# Finds the shortest walk between two locations for the travel command.
+# Small worlds use next-hop tables: the first time a destination is asked
+# for, one breadth-first search backwards from it gives the direction to
+# take from every location, and the table is kept for later trips. Large
+# worlds use A* guided by the distances to and from a few landmark rooms
+# (the ALT heuristic), which needs only a handful of arrays however many
+# locations there are.
+#
+# A Router follows the world's exits plus any a session has opened, closed
+# or redirected. When an exit changes it drops only the next-hop tables
+# the change can affect and patches the landmark distances in place, so
+# the next trip does not start from scratch.
+
+import heapq
+from array import array
+from collections import OrderedDict, deque
+
+# Worlds with at most this many locations use next-hop tables
+ALL_PAIRS_LIMIT = 4096
+
+# Next-hop tables kept per router
+TABLE_CACHE_SIZE = 256
+
+# Landmarks used by A* on larger worlds
+LANDMARK_COUNT = 4
+
+
+def reverse_exits(world):
+    """Return (offsets, sources, directions) listing the exits leading into each location.
+
+    The exits into location v are sources[i] going directions[i], for i in
+    range(offsets[v], offsets[v + 1]).
+    """
+    count = len(world.location_ids)
+    offsets = array('i', [0]) * (count + 1)
+    for targets in world.exits:
+        for target in targets:
+            if target >= 0:
+                offsets[target + 1] += 1
+    for index in range(count):
+        offsets[index + 1] += offsets[index]
+
+    sources = array('i', [0]) * offsets[count]
+    directions = array('i', [0]) * offsets[count]
+    cursor = array('i', offsets)
+    for direction, targets in enumerate(world.exits):
+        for source, target in enumerate(targets):
+            if target >= 0:
+                position = cursor[target]
+                sources[position] = source
+                directions[position] = direction
+                cursor[target] = position + 1
+    return offsets, sources, directions
+
+
+class Router:
+    """Shortest routes over a world's exits, as changed by one session.
+
+    The router a World hands out follows the world's own exits and is
+    shared by every session. A session that changes an exit gets its own
+    copy (see WorldState.set_exit), which keeps sharing every table the
+    change does not invalidate.
+    """
+
+    def __init__(self, world, reverse=None, landmarks=None):
+        self.world = world
+        self.size = len(world.location_ids)
+        self.overrides = {}           # (location, direction) -> target, for exits the session changed
+        self.opened = {}              # target -> [(location, direction)] for changed exits leading there
+        self.tables = OrderedDict()   # destination -> (distances, directions) next-hop table
+        self._reverse = reverse
+        self._landmarks = landmarks   # [forward, backward] distances per landmark; None once stale
+        self._owned = set()           # (landmark, side) arrays this router may modify
+
+    def copy(self, overrides):
+        """Return a router for a session whose changed exits are held in overrides."""
+        router = Router(self.world, self._reverse)
+        router.overrides = overrides
+        router.opened = {target: list(sources) for target, sources in self.opened.items()}
+        router.tables = OrderedDict(self.tables)
+        if self._landmarks is not None:
+            router._landmarks = [list(entry) if entry is not None else None for entry in self._landmarks]
+        return router
+
+    @property
+    def reverse(self):
+        """The exits leading into each location, as returned by reverse_exits."""
+        if self._reverse is None:
+            self._reverse = reverse_exits(self.world)
+        return self._reverse
+
+    @property
+    def landmarks(self):
+        """The [forward, backward] distance arrays of every landmark still in use."""
+        if self._landmarks is None:
+            self._landmarks = self._choose_landmarks()
+        return [entry for entry in self._landmarks if entry is not None]
+
+    def exit_target(self, location, direction):
+        """Return where an exit leads, or -1 if there is no such exit."""
+        if self.overrides:
+            target = self.overrides.get((location, direction))
+            if target is not None:
+                return target
+        return self.world.exits[direction][location]
+
+    def _successors(self, location):
+        """Yield (direction, target) for every exit out of a location."""
+        overrides = self.overrides
+        for direction, targets in enumerate(self.world.exits):
+            target = targets[location]
+            if overrides:
+                target = overrides.get((location, direction), target)
+            if target >= 0:
+                yield direction, target
+
+    def _predecessors(self, location):
+        """Yield (direction, source) for every exit into a location."""
+        offsets, sources, directions = self.reverse
+        for position in range(offsets[location], offsets[location + 1]):
+            source, direction = sources[position], directions[position]
+            if not self.overrides or self.exit_target(source, direction) == location:
+                yield direction, source
+        for source, direction in self.opened.get(location, ()):
+            yield direction, source
+
+    def distances(self, root, backward=False):
+        """Return the moves from root to every location (or from every location to root); -1 if none."""
+        distances = array('i', [-1]) * self.size
+        distances[root] = 0
+        queue = deque([root])
+        if self.overrides:
+            neighbours = self._predecessors if backward else self._successors
+            while queue:
+                location = queue.popleft()
+                distance = distances[location] + 1
+                for _, neighbour in neighbours(location):
+                    if distances[neighbour] < 0:
+                        distances[neighbour] = distance
+                        queue.append(neighbour)
+            return distances
+
+        # The world's own exits: read the arrays directly, as this runs over every location
+        exits = self.world.exits
+        offsets, sources, _ = self.reverse
+        while queue:
+            location = queue.popleft()
+            distance = distances[location] + 1
+            if backward:
+                neighbours = sources[offsets[location]:offsets[location + 1]]
+            else:
+                neighbours = [targets[location] for targets in exits]
+            for neighbour in neighbours:
+                if neighbour >= 0 and distances[neighbour] < 0:
+                    distances[neighbour] = distance
+                    queue.append(neighbour)
+        return distances
+
+    def _choose_landmarks(self):
+        """Pick landmarks far from the start and from each other, with their distance arrays."""
+        landmarks = []
+        nearest = self.distances(self.world.start_location)
+        for _ in range(LANDMARK_COUNT):
+            root = max(range(self.size), key=nearest.__getitem__)
+            if nearest[root] <= 0:
+                break
+            forward = self.distances(root)
+            landmarks.append([forward, self.distances(root, backward=True)])
+            for location, distance in enumerate(forward):
+                if 0 <= distance < nearest[location]:
+                    nearest[location] = distance
+        return landmarks
+
+    def route(self, source, target):
+        """Return the direction indexes of a shortest walk from source to target, or None."""
+        if source == target:
+            return []
+        if self.size > ALL_PAIRS_LIMIT:
+            return self._search(source, target)
+
+        distances, directions = self._table(target)
+        if distances[source] < 0:
+            return None
+        path = []
+        location = source
+        while location != target:
+            direction = directions[location]
+            path.append(direction)
+            location = self.exit_target(location, direction)
+        return path
+
+    def _table(self, target):
+        """Return the distance and next-direction arrays for reaching target from everywhere."""
+        table = self.tables.get(target)
+        if table is not None:
+            self.tables.move_to_end(target)
+            return table
+
+        distances = array('i', [-1]) * self.size
+        directions = array('i', [-1]) * self.size
+        distances[target] = 0
+        queue = deque([target])
+        while queue:
+            location = queue.popleft()
+            distance = distances[location] + 1
+            for direction, source in self._predecessors(location):
+                if distances[source] < 0:
+                    distances[source] = distance
+                    directions[source] = direction
+                    queue.append(source)
+
+        table = (distances, directions)
+        self.tables[target] = table
+        if len(self.tables) > TABLE_CACHE_SIZE:
+            self.tables.popitem(last=False)
+        return table
+
+    def _search(self, source, target):
+        """A* from source to target, guided by the landmark distances."""
+        landmarks = self.landmarks
+        for forward, backward in landmarks:
+            # A landmark that reaches the source but not the target proves there is no route
+            if forward[source] >= 0 > forward[target] or backward[target] >= 0 > backward[source]:
+                return None
+
+        def estimate(location):
+            best = 0
+            for forward, backward in landmarks:
+                if forward[location] >= 0 and forward[target] >= 0:
+                    best = max(best, forward[target] - forward[location])
+                if backward[location] >= 0 and backward[target] >= 0:
+                    best = max(best, backward[location] - backward[target])
+            return best
+
+        # Entries are (estimated total, -moves so far, location): among equal estimates
+        # the location furthest along is expanded first, which matters on grid-like maps
+        moves = {source: 0}
+        came_from = {}
+        heap = [(estimate(source), 0, source)]
+        while heap:
+            _, distance, location = heapq.heappop(heap)
+            distance = -distance
+            if location == target:
+                break
+            if distance > moves[location]:
+                continue
+            distance += 1
+            for direction, neighbour in self._successors(location):
+                if distance < moves.get(neighbour, distance + 1):
+                    moves[neighbour] = distance
+                    came_from[neighbour] = (location, direction)
+                    heapq.heappush(heap, (distance + estimate(neighbour), -distance, neighbour))
+        else:
+            return None
+
+        path = []
+        location = target
+        while location != source:
+            location, direction = came_from[location]
+            path.append(direction)
+        path.reverse()
+        return path
+
+    def exit_changed(self, location, direction, old, new):
+        """Bring the router up to date after the exit from location in direction moved from old to new.
+
+        Either target may be -1, meaning the exit was closed or has just
+        been opened. The session's overrides must already hold the change.
+        """
+        world_target = self.world.exits[direction][location]
+        if old >= 0 and old != world_target:
+            sources = self.opened[old]
+            sources.remove((location, direction))
+            if not sources:
+                del self.opened[old]
+        if new >= 0 and new != world_target:
+            self.opened.setdefault(new, []).append((location, direction))
+
+        # A next-hop table is only wrong if it used the old exit or the new one is a shortcut
+        for destination, (distances, directions) in list(self.tables.items()):
+            if ((old >= 0 and directions[location] == direction)
+                    or (new >= 0 and distances[new] >= 0
+                        and (distances[location] < 0 or distances[new] + 1 < distances[location]))):
+                del self.tables[destination]
+
+        if self._landmarks is None:
+            return
+        for landmark, entry in enumerate(self._landmarks):
+            if entry is None:
+                continue
+            forward, backward = entry
+            # Losing an exit that lay on a shortest path can lengthen any distance; stop using the landmark
+            if old >= 0 and ((forward[location] >= 0 and forward[old] == forward[location] + 1)
+                             or (backward[old] >= 0 and backward[location] == backward[old] + 1)):
+                self._landmarks[landmark] = None
+                continue
+            if new >= 0:
+                if forward[location] >= 0 and (forward[new] < 0 or forward[location] + 1 < forward[new]):
+                    forward = self._writable(landmark, 0)
+                    forward[new] = forward[location] + 1
+                    self._relax(forward, new, self._successors)
+                if backward[new] >= 0 and (backward[location] < 0 or backward[new] + 1 < backward[location]):
+                    backward = self._writable(landmark, 1)
+                    backward[location] = backward[new] + 1
+                    self._relax(backward, location, self._predecessors)
+
+    def _writable(self, landmark, side):
+        """Return a landmark's distance array, copying it first if it is shared."""
+        if (landmark, side) not in self._owned:
+            self._landmarks[landmark][side] = array('i', self._landmarks[landmark][side])
+            self._owned.add((landmark, side))
+        return self._landmarks[landmark][side]
+
+    def _relax(self, distances, start, neighbours):
+        """Spread a shortened distance at start to every location it now brings closer."""
+        queue = deque([start])
+        while queue:
+            location = queue.popleft()
+            distance = distances[location] + 1
+            for _, neighbour in neighbours(location):
+                if distances[neighbour] < 0 or distance < distances[neighbour]:
+                    distances[neighbour] = distance
+                    queue.append(neighbour)
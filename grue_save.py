@@ -0,0 +1,356 @@
+# Grue Text Adventure Engine - Event-Sourced Save Games
+#
+# A save is a directory holding an append-only journal of every command
+# the session accepted, plus a compact binary checkpoint of the session
+# state taken every so often. Restoring loads the checkpoint and replays
+# only the commands journaled after it.
+
+import json
+import os
+
+from grue_state import ItemSet, WorldState, PlayerState
+
+MAGIC = b"GRUE"
+FORMAT_VERSION = 6
+
+
+def _write_varint(out, value):
+    """Append a non-negative integer to out in LEB128 form."""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    """Read a LEB128 integer from data at pos, returning (value, new_pos)."""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _write_ints(out, values):
+    _write_varint(out, len(values))
+    for value in values:
+        _write_varint(out, value)
+
+
+def _read_ints(data, pos):
+    count, pos = _read_varint(data, pos)
+    values = []
+    for _ in range(count):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values, pos
+
+
+def _write_text(out, text):
+    raw = text.encode("utf-8")
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_text(data, pos):
+    length, pos = _read_varint(data, pos)
+    return bytes(data[pos:pos + length]).decode("utf-8"), pos + length
+
+
+def encode_state(state, player):
+    """Encode a session's state as compact bytes.
+
+    Only what differs from the pristine world is stored: the player's own
+    state, the contents of locations the session has changed, the items
+    and exits it has shown, hidden, opened or closed, the item properties
+    its triggers have changed, the once-only triggers that have fired and
+    where the moving characters are in their schedule. The encoding is
+    canonical, so equal states always give equal bytes.
+    """
+    world = state.world
+    out = bytearray()
+    _write_varint(out, player.current_location)
+    _write_varint(out, player.max_inventory)
+    _write_ints(out, player.inventory)
+
+    # Weight limit, stored as JSON as it may be fractional or None
+    _write_text(out, json.dumps(player.max_weight))
+
+    # Visited locations, sorted and delta-encoded
+    previous = 0
+    deltas = []
+    for location in sorted(player.visited):
+        deltas.append(location - previous)
+        previous = location
+    _write_ints(out, deltas)
+
+    # Counters: integers are stored directly, anything else as JSON
+    _write_varint(out, len(player.stats))
+    for name, value in player.stats.items():
+        _write_text(out, name)
+        if type(value) is int:
+            out.append(0)
+            _write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+        else:
+            out.append(1)
+            _write_text(out, json.dumps(value))
+
+    # Locations whose contents no longer match the world
+    changed = sorted((location, items) for location, items in state.location_items.items()
+                     if tuple(items) != tuple(world.locations[location].items))
+    _write_varint(out, len(changed))
+    for location, items in changed:
+        _write_varint(out, location)
+        _write_ints(out, items)
+
+    changed = sorted((location, characters) for location, characters in state.location_characters.items()
+                     if tuple(characters) != world.locations[location].characters)
+    _write_varint(out, len(changed))
+    for location, characters in changed:
+        _write_varint(out, location)
+        _write_ints(out, characters)
+
+    # Items shown or hidden, stored as item * 2 + visible
+    _write_ints(out, sorted(item * 2 + visible for item, visible in state.item_visibility.items()
+                            if visible != world.items[item].visible))
+
+    # Changed exits, stored with target + 1 so a closed exit is 0
+    changed = sorted(state.exit_overrides.items())
+    _write_varint(out, len(changed))
+    for (location, direction), target in changed:
+        _write_varint(out, location)
+        _write_varint(out, direction)
+        _write_varint(out, target + 1)
+
+    # Item properties that no longer match the world, as JSON objects
+    changed = []
+    for item, properties in sorted(state.item_properties.items()):
+        original = world.items[item].properties
+        properties = {name: value for name, value in properties.items()
+                      if name not in original or original[name] != value}
+        if properties:
+            changed.append((item, properties))
+    _write_varint(out, len(changed))
+    for item, properties in changed:
+        _write_varint(out, item)
+        _write_text(out, json.dumps(properties, sort_keys=True))
+
+    _write_ints(out, sorted(state.fired))
+
+    # The tick the schedule has reached, and the steps each sleeping character has taken
+    schedule = state.schedule
+    if schedule is None:
+        out.append(0)
+    else:
+        out.append(1)
+        _write_varint(out, schedule.tick)
+        _write_ints(out, [value for character, steps in sorted(schedule.asleep.items())
+                          for value in (character, steps)])
+
+    return bytes(out)
+
+
+def decode_state(data, world, pos=0):
+    """Rebuild (WorldState, PlayerState) for a world from encode_state's bytes."""
+    state = WorldState(world)
+    player = PlayerState(world)
+
+    player.current_location, pos = _read_varint(data, pos)
+    player.max_inventory, pos = _read_varint(data, pos)
+    inventory, pos = _read_ints(data, pos)
+    player.inventory = ItemSet.fromkeys(inventory)
+    player.carried_weight = sum(world.items[item].weight for item in inventory)
+    text, pos = _read_text(data, pos)
+    player.max_weight = json.loads(text)
+
+    deltas, pos = _read_ints(data, pos)
+    location = 0
+    for delta in deltas:
+        location += delta
+        player.visited.add(location)
+
+    count, pos = _read_varint(data, pos)
+    player.stats = {}
+    for _ in range(count):
+        name, pos = _read_text(data, pos)
+        tag = data[pos]
+        pos += 1
+        if tag == 0:
+            value, pos = _read_varint(data, pos)
+            player.stats[name] = value // 2 if value % 2 == 0 else -(value + 1) // 2
+        else:
+            text, pos = _read_text(data, pos)
+            player.stats[name] = json.loads(text)
+
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        location, pos = _read_varint(data, pos)
+        items, pos = _read_ints(data, pos)
+        state.location_items[location] = ItemSet.fromkeys(items)
+        state.touch(location)
+
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        location, pos = _read_varint(data, pos)
+        state.location_characters[location], pos = _read_ints(data, pos)
+        state.touch(location)
+
+    visibility, pos = _read_ints(data, pos)
+    for value in visibility:
+        state.item_visibility[value // 2] = bool(value % 2)
+    if visibility:
+        state.touch_all()
+
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        location, pos = _read_varint(data, pos)
+        direction, pos = _read_varint(data, pos)
+        target, pos = _read_varint(data, pos)
+        state.set_exit(location, direction, target - 1)
+
+    count, pos = _read_varint(data, pos)
+    for _ in range(count):
+        item, pos = _read_varint(data, pos)
+        text, pos = _read_text(data, pos)
+        state.item_properties[item] = json.loads(text)
+
+    fired, pos = _read_ints(data, pos)
+    state.fired.update(fired)
+
+    scheduled = data[pos]
+    pos += 1
+    if scheduled:
+        tick, pos = _read_varint(data, pos)
+        asleep, pos = _read_ints(data, pos)
+        state.schedule.restore(state, tick, zip(asleep[::2], asleep[1::2]))
+
+    return state, player
+
+
+class SaveGame:
+    """Event-sourced save for one session, kept in its own directory.
+
+    Attach it to an engine with GrueEngine.save_game and every command the
+    engine accepts is appended to the journal. Every checkpoint_every
+    commands the session state is written as a checkpoint recording how
+    far into the journal it reaches, so restoring only replays the tail.
+    """
+
+    JOURNAL = "journal.log"
+    CHECKPOINT = "checkpoint.bin"
+
+    def __init__(self, directory, checkpoint_every=100, sync=False):
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+        self.sync = sync
+        self.journal = None
+        self.commands = 0
+        self.since_checkpoint = 0
+
+    def exists(self):
+        """Return True if there is a saved session to restore."""
+        return (os.path.exists(os.path.join(self.directory, self.JOURNAL))
+                or os.path.exists(os.path.join(self.directory, self.CHECKPOINT)))
+
+    def _open_journal(self):
+        if self.journal is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.journal = open(os.path.join(self.directory, self.JOURNAL), "ab")
+
+    def record(self, engine, command):
+        """Append an accepted command to the journal, checkpointing when one is due."""
+        self._open_journal()
+        self.journal.write(" ".join(command.split()).encode("utf-8") + b"\n")
+        self.journal.flush()
+        if self.sync:
+            os.fsync(self.journal.fileno())
+
+        self.commands += 1
+        self.since_checkpoint += 1
+        if self.since_checkpoint >= self.checkpoint_every:
+            self.checkpoint(engine)
+
+    def checkpoint(self, engine):
+        """Write the engine's current state as the latest checkpoint."""
+        self._open_journal()
+        out = bytearray(MAGIC)
+        out.append(FORMAT_VERSION)
+        out += engine.world.fingerprint()
+        _write_varint(out, self.journal.tell())
+        _write_varint(out, self.commands)
+        out += encode_state(engine.state, engine.player)
+
+        # Write a new file and swap it in, so a crash never leaves a torn checkpoint
+        path = os.path.join(self.directory, self.CHECKPOINT)
+        with open(path + ".tmp", "wb") as f:
+            f.write(out)
+            if self.sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self.since_checkpoint = 0
+
+    def _read_checkpoint(self, world):
+        """Return (journal_offset, commands, state, player) from the checkpoint, or None."""
+        path = os.path.join(self.directory, self.CHECKPOINT)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+
+        if data[:4] != MAGIC or data[4] != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a Grue checkpoint this version can read")
+        if data[5:13] != world.fingerprint():
+            raise ValueError(f"{path} was saved from a different game world")
+
+        offset, pos = _read_varint(data, 13)
+        commands, pos = _read_varint(data, pos)
+        state, player = decode_state(data, world, pos)
+        return offset, commands, state, player
+
+    def restore(self, engine):
+        """Bring an engine that has just loaded the game up to the saved state.
+
+        Returns the number of journaled commands that had to be replayed.
+        """
+        offset = 0
+        self.commands = 0
+        checkpoint = self._read_checkpoint(engine.world)
+        if checkpoint is not None:
+            offset, self.commands, engine.state, engine.player = checkpoint
+
+        path = os.path.join(self.directory, self.JOURNAL)
+        tail = b""
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                f.seek(offset)
+                tail = f.read()
+
+        # A crash can leave half a line at the end; drop it before appending again
+        complete = tail.rfind(b"\n") + 1
+        if complete < len(tail):
+            with open(path, "r+b") as f:
+                f.truncate(offset + complete)
+
+        replayed = 0
+        save_game, engine.save_game = engine.save_game, None
+        try:
+            for line in tail[:complete].decode("utf-8").splitlines():
+                engine.process_command(line)
+                replayed += 1
+        finally:
+            engine.save_game = save_game
+
+        self.commands += replayed
+        self.since_checkpoint = replayed
+        return replayed
+
+    def close(self):
+        """Close the journal."""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
@@ -0,0 +1,330 @@
+# Grue Text Adventure Engine - Multi-Session Server
+#
+# Runs many game sessions in a single asyncio event loop over a simple
+# line-based TCP protocol: the server sends text, the client sends one
+# command per line. Any line-oriented client will do, for example:
+#
+#     python grue_server.py --port 4000
+#     nc localhost 4000
+#
+# Each player normally gets a world of their own. With --shared, everyone
+# playing the same game is put into one world (see grue_multiplayer).
+
+import argparse
+import asyncio
+import os
+import re
+import signal
+
+from grue_engine import GrueEngine
+from grue_history import History
+from grue_log import CommandLog
+from grue_metrics import Metrics, instrument
+from grue_multiplayer import SharedWorld
+from grue_registry import GameRegistry
+from grue_save import SaveGame
+
+
+class Session:
+    """One connected player and the engine running their game."""
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.engine = None
+        self.output = []  # Text waiting to be written to the client
+        self._draining = asyncio.Lock()  # Held while waiting for the client to read what was written
+        self._delivery = None            # Task flushing messages from a shared world, if one is due
+
+    def send(self, text):
+        """Queue text to be written on the next flush."""
+        self.output.append(text)
+
+    def deliver(self, text):
+        """Queue a message from the shared world, on its own line before a fresh prompt, and flush it soon."""
+        self.send(f"\n{text}\n> ")
+        if self._delivery is None:
+            self._delivery = asyncio.ensure_future(self._flush_delivery())
+
+    async def _flush_delivery(self):
+        """Flush delivered messages, cutting off a client that has stopped reading them."""
+        try:
+            await self.flush()
+        except asyncio.TimeoutError:
+            self.writer.transport.abort()
+        except ConnectionError:
+            pass
+        finally:
+            self._delivery = None
+
+    async def flush(self):
+        """Write queued output in one go and wait if the client is reading slowly.
+
+        Raises asyncio.TimeoutError if the client stops reading long enough
+        for its buffer to stay above the transport's high-water mark.
+        """
+        if not self.output:
+            return
+        self.writer.write("".join(self.output).encode("utf-8"))
+        self.output.clear()
+        async with self._draining:
+            await asyncio.wait_for(self.writer.drain(), timeout=self.server.drain_timeout)
+
+    async def read_line(self):
+        """Read one line from the client, or None if it disconnected or went idle."""
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), timeout=self.server.idle_timeout)
+        except asyncio.TimeoutError:
+            self.send("\nIdle for too long. Goodbye.\n")
+            return None
+        except (asyncio.LimitOverrunError, ValueError):
+            self.send("\nLine too long. Goodbye.\n")
+            return None
+
+        if not line:
+            return None
+        return line.decode("utf-8", errors="replace").strip()
+
+    async def choose_game(self):
+        """Ask the client to pick a game and return its ID, or None to disconnect."""
+        game_ids = self.server.game_ids
+        if len(game_ids) == 1:
+            return game_ids[0]
+
+        lines = ["", "Grue - Text Adventure Engine", "=========================", "Available Adventures:", ""]
+        for i, game_id in enumerate(game_ids, 1):
+            lines.append(f"{i}. {self.server.registry.get(game_id)['title']}")
+        lines.extend(["", "0. Quit", ""])
+        self.send("\n".join(lines) + "\n")
+
+        while True:
+            self.send("Select an adventure (number): ")
+            await self.flush()
+            choice = await self.read_line()
+            if choice is None or choice == '0':
+                return None
+            try:
+                index = int(choice) - 1
+            except ValueError:
+                self.send("Please enter a number.\n")
+                continue
+            if 0 <= index < len(game_ids):
+                return game_ids[index]
+            self.send("Invalid selection. Please try again.\n")
+
+    async def open_save(self, game_id):
+        """Ask the client for a name and return the SaveGame to keep their progress in."""
+        while True:
+            self.send("Enter a name to save your progress under: ")
+            await self.flush()
+            name = await self.read_line()
+            if name is None:
+                return None
+            if re.fullmatch(r"[A-Za-z0-9_-]{1,32}", name):
+                return SaveGame(os.path.join(self.server.save_dir, game_id, name.lower()))
+            self.send("Names may only use letters, digits, '-' and '_'.\n")
+
+    async def join_shared(self, game_id):
+        """Ask the client for a name and return their SharedPlayer in the game's shared world."""
+        shared = self.server.shared_world(game_id)
+        while True:
+            self.send("Enter a name to be known by: ")
+            await self.flush()
+            name = await self.read_line()
+            if name is None:
+                return None
+            if not re.fullmatch(r"[A-Za-z0-9_-]{1,32}", name):
+                self.send("Names may only use letters, digits, '-' and '_'.\n")
+                continue
+            player = shared.join(name, self.deliver)
+            if player is not None:
+                return player
+            self.send("Someone here is already using that name.\n")
+
+    async def run(self):
+        """Play one game with the client until it quits, disconnects or goes idle."""
+        game_id = await self.choose_game()
+        if game_id is None:
+            return
+
+        save_game = None
+        if self.server.save_dir:
+            save_game = await self.open_save(game_id)
+            if save_game is None:
+                return
+
+        shared_player = None
+        if self.server.shared:
+            shared_player = await self.join_shared(game_id)
+            if shared_player is None:
+                return
+            self.engine = shared_player.engine
+        else:
+            self.engine = GrueEngine()
+            self.engine.load_game(self.server.registry.load(game_id))
+        self.engine.running = True
+        self.send(self.engine.display_intro() + "\n")
+
+        if save_game is not None:
+            if save_game.exists():
+                save_game.restore(self.engine)
+                self.send("Welcome back. Your progress has been restored.\n")
+            self.engine.save_game = save_game
+
+        if self.server.undo_depth:
+            History(self.server.undo_depth).attach(self.engine)
+
+        if self.server.log_dir:
+            self.engine.command_log = self.server.command_log(game_id, self.engine.world).session()
+
+        if self.server.metrics is not None:
+            instrument(self.engine, self.server.metrics)
+
+        try:
+            while self.engine.running:
+                self.send(self.engine.display_location() + "\n> ")
+                await self.flush()
+
+                command = await self.read_line()
+                if command is None:
+                    break
+                self.send(self.engine.process_line(command.lower()) + "\n")
+        finally:
+            if save_game is not None:
+                save_game.checkpoint(self.engine)
+                save_game.close()
+            if self.engine.command_log is not None:
+                self.engine.command_log.close()
+            if shared_player is not None:
+                shared_player.shared.leave(shared_player)
+
+
+class GrueServer:
+    """Hosts many concurrent game sessions in one event loop."""
+
+    def __init__(self, registry, game_ids=None, host="127.0.0.1", port=4000, idle_timeout=600.0,
+                 drain_timeout=30.0, max_line=1024, write_buffer_limit=64 * 1024, max_sessions=10000,
+                 save_dir=None, metrics=None, shared=False, tick_interval=0.25, undo_depth=0,
+                 log_dir=None):
+        self.registry = registry
+        self.game_ids = game_ids or registry.ids()
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.drain_timeout = drain_timeout
+        self.max_line = max_line
+        self.write_buffer_limit = write_buffer_limit
+        self.max_sessions = max_sessions
+        self.save_dir = save_dir
+        self.metrics = metrics  # Optional grue_metrics.Metrics every session records into
+        self.shared = shared    # Put every player of a game in one SharedWorld
+        self.tick_interval = tick_interval
+        self.undo_depth = undo_depth  # Moves each player can undo; 0 turns undo off
+        self.log_dir = log_dir        # Directory of columnar command logs, one per game
+        self.command_logs = {}
+        self.shared_worlds = {}
+        self.sessions = set()
+        self._tick_tasks = []
+
+    def shared_world(self, game_id):
+        """Return the SharedWorld for a game, starting its clock on first use."""
+        shared = self.shared_worlds.get(game_id)
+        if shared is None:
+            shared = self.shared_worlds[game_id] = SharedWorld(self.registry.load(game_id))
+            self._tick_tasks.append(asyncio.get_running_loop().create_task(self._run_ticks(shared)))
+        return shared
+
+    def command_log(self, game_id, world):
+        """Return the CommandLog for a game, opening it on first use."""
+        log = self.command_logs.get(game_id)
+        if log is None:
+            log = self.command_logs[game_id] = CommandLog(os.path.join(self.log_dir, game_id), world, game_id)
+        return log
+
+    async def _run_ticks(self, shared):
+        """Tick a shared world every tick_interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            shared.tick()
+
+    async def handle_client(self, reader, writer):
+        """Run a session for a newly connected client."""
+        writer.transport.set_write_buffer_limits(high=self.write_buffer_limit)
+        session = Session(self, reader, writer)
+
+        try:
+            if len(self.sessions) >= self.max_sessions:
+                session.send("The server is full. Please try again later.\n")
+            else:
+                self.sessions.add(session)
+                await session.run()
+            await session.flush()
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    async def serve_forever(self):
+        """Listen for clients until cancelled."""
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=self.max_line)
+        async with server:
+            await server.serve_forever()
+
+
+def _interrupt(signum, frame):
+    """Stop the server on SIGTERM the same way as on Ctrl-C."""
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Grue adventures to many players over TCP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=4000, help="port to listen on")
+    parser.add_argument("--game", help="serve only this game instead of offering a menu")
+    parser.add_argument("--idle-timeout", type=float, default=600.0,
+                        help="seconds a client may stay silent before being disconnected")
+    parser.add_argument("--max-sessions", type=int, default=10000, help="maximum number of concurrent players")
+    parser.add_argument("--save-dir", help="keep each player's progress in this directory so it survives restarts")
+    parser.add_argument("--shared", action="store_true",
+                        help="put everyone playing the same game in one world instead of one each")
+    parser.add_argument("--tick", type=float, default=0.25,
+                        help="seconds between deliveries of messages in shared worlds (default: 0.25)")
+    parser.add_argument("--undo", type=int, default=0, metavar="MOVES",
+                        help="let each player undo up to MOVES moves (default: off)")
+    parser.add_argument("--log", metavar="DIR", help="log every command in columnar files under DIR for grue_analytics")
+    parser.add_argument("--metrics", metavar="FILE", help="record command counts and latencies, written to FILE")
+    parser.add_argument("--metrics-interval", type=float, default=60.0,
+                        help="seconds between rewrites of the metrics file (default: 60)")
+    args = parser.parse_args()
+
+    if args.shared and args.save_dir:
+        parser.error("--save-dir keeps one world per player, so it cannot be used with --shared")
+    if args.shared and args.undo:
+        parser.error("players in a shared world cannot undo their moves, so --undo cannot be used with --shared")
+
+    registry = GameRegistry()
+    if args.game and registry.get(args.game) is None:
+        parser.error(f"unknown game '{args.game}' (choose from {', '.join(registry.ids())})")
+
+    metrics = Metrics(args.metrics, args.metrics_interval) if args.metrics else None
+    server = GrueServer(registry, [args.game] if args.game else None, args.host, args.port,
+                        idle_timeout=args.idle_timeout, max_sessions=args.max_sessions, save_dir=args.save_dir,
+                        metrics=metrics, shared=args.shared, tick_interval=args.tick,
+                        undo_depth=args.undo, log_dir=args.log)
+    print(f"Serving Grue on {args.host}:{args.port}")
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metrics is not None:
+            metrics.flush()
+        for log in server.command_logs.values():
+            log.close()
+
+
+if __name__ == "__main__":
+    main()
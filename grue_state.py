@@ -0,0 +1,336 @@
+# Grue Text Adventure Engine - Per-Session State Overlays
+
+from grue_npcs import Schedule
+
+
+class ItemSet(dict):
+    """Insertion-ordered set of item indexes.
+
+    Membership tests, adding and removing cost O(1) however many items it
+    holds, and iterating gives the items in the order they arrived, which
+    is the order they are listed to the player in.
+    """
+
+    __slots__ = ()
+
+    def add(self, item):
+        """Add an item at the end, if it is not already present."""
+        self[item] = None
+
+    def remove(self, item):
+        """Remove an item, raising KeyError if it is not present."""
+        del self[item]
+
+
+class WorldState:
+    """Copy-on-write overlay of the changes a session makes to a World.
+
+    Only locations whose contents have changed get their own item or
+    character list, and only exits that have changed are recorded; every
+    other location is read straight from the shared World. Locations, items and characters are referred to by their
+    integer indexes.
+
+    Each change bumps a version counter for the locations it affects, so
+    text rendered for a location can be reused until its version moves.
+    Changes that may show anywhere, such as an item becoming visible,
+    bump the version of every location at once.
+
+    While a history is kept, journal lists (table, key, old value) for
+    every table entry changed since the last move was recorded, and owned
+    holds the (table, key) pairs listed so far. An entry is listed the
+    first time a move changes it, and a room's items (or any other entry
+    that is changed in place) are copied then, so the journal keeps the
+    old one; copied counts the entries copied that way. A key of None
+    stands for a whole table, for the small ones kept that way.
+    """
+
+    __slots__ = ('world', 'location_items', 'location_characters', 'item_visibility', 'item_properties',
+                 'exit_overrides', 'router', 'fired', 'schedule', 'versions', 'version', 'rendered',
+                 'journal', 'owned', 'copied')
+
+    def __init__(self, world):
+        self.world = world
+        self.location_items = {}
+        self.location_characters = {}
+        self.item_visibility = {}
+        self.item_properties = {}  # Item -> {name: value} for properties the session changed
+        self.exit_overrides = {}   # (location, direction) -> target, -1 for a closed exit
+        self.router = None         # This session's own Router, once its exits differ from the world's
+        self.fired = set()         # Indexes of once-only triggers that have fired
+        self.schedule = Schedule(world.behaviours) if world.behaviours else None  # Characters that move
+        self.versions = {}
+        self.version = 0
+        self.rendered = {}  # Location -> (version, text) for locations this session changed
+        self.journal = None  # Changes since the last recorded move, while a grue_history.History is kept
+        self.owned = set()
+        self.copied = 0
+
+    def copy(self):
+        """Return an independent copy of the session's changes over the same world.
+
+        It costs time in proportion to what the session has changed; text
+        rendered for changed locations is not copied and is rendered again
+        when next shown.
+        """
+        state = WorldState.__new__(WorldState)
+        state.world = self.world
+        state.location_items = {location: ItemSet(items) for location, items in self.location_items.items()}
+        state.location_characters = {location: list(characters)
+                                     for location, characters in self.location_characters.items()}
+        state.item_visibility = dict(self.item_visibility)
+        state.item_properties = {item: dict(properties) for item, properties in self.item_properties.items()}
+        state.exit_overrides = dict(self.exit_overrides)
+        state.router = None  # Rebuilt from the world's when next needed
+        state.fired = set(self.fired)
+        state.schedule = None if self.schedule is None else self.schedule.copy()
+        state.versions = dict(self.versions)
+        state.version = self.version
+        state.rendered = {}
+        state.journal = None
+        state.owned = set()
+        state.copied = 0
+        return state
+
+    def remember(self, name, key, value):
+        """List a table entry's value before this move first changes it, if a history is kept.
+
+        Returns True if the value was just listed, in which case an entry
+        that is changed in place must be replaced by a copy first.
+        """
+        if self.journal is None or (name, key) in self.owned:
+            return False
+        self.owned.add((name, key))
+        self.journal.append((name, key, value))
+        return True
+
+    def revert(self, changes):
+        """Put back the old values listed in a journal, as they were before its changes.
+
+        The values are copied in, so the journal can be reverted again.
+        Text rendered since may no longer match a location's version, so
+        it is dropped, and the router is rebuilt if exits changed back.
+        """
+        schedule = self.schedule
+        for name, key, value in reversed(changes):
+            owner = schedule if name in Schedule.JOURNALED else self
+            if value is not None:
+                value = type(value)(value)
+            if key is None:
+                setattr(owner, name, value)
+                if name == 'exit_overrides':
+                    self.router = None
+            elif value is None:
+                del getattr(owner, name)[key]
+            else:
+                getattr(owner, name)[key] = value
+        self.rendered.clear()
+
+    def version_of(self, location):
+        """Return the version of a location; 0 means it is unchanged from the world."""
+        return self.versions.get(location, 0) + self.version
+
+    def touch(self, location):
+        """Record that something visible in a location has changed."""
+        version = self.versions.get(location)
+        self.remember('versions', location, version)
+        self.versions[location] = (version or 0) + 1
+
+    def touch_all(self):
+        """Record a change that may be visible in any location."""
+        self.version += 1
+        self.rendered.clear()
+
+    def items_at(self, location):
+        """Return the items currently in a location."""
+        items = self.location_items.get(location)
+        if items is None:
+            return self.world.locations[location].items
+        return items
+
+    def _own_items(self, location):
+        """Return a private, writable item set for a location."""
+        items = self.location_items.get(location)
+        if self.remember('location_items', location, items) or items is None:
+            items = ItemSet.fromkeys(self.world.locations[location].items) if items is None else ItemSet(items)
+            self.location_items[location] = items
+            self.copied += len(items)
+        return items
+
+    def add_item(self, location, item):
+        """Place an item in a location."""
+        self._own_items(location).add(item)
+        self.touch(location)
+
+    def remove_item(self, location, item):
+        """Remove an item from a location."""
+        self._own_items(location).remove(item)
+        self.touch(location)
+
+    def characters_at(self, location):
+        """Return the characters currently in a location."""
+        characters = self.location_characters.get(location)
+        if characters is None:
+            return self.world.locations[location].characters
+        return characters
+
+    def _own_characters(self, location):
+        """Return a private, writable character list for a location."""
+        characters = self.location_characters.get(location)
+        if self.remember('location_characters', location, characters) or characters is None:
+            characters = list(self.characters_at(location))
+            self.location_characters[location] = characters
+            self.copied += len(characters)
+        return characters
+
+    def move_character(self, character, source, destination):
+        """Move a character from one location to another."""
+        self._own_characters(source).remove(character)
+        self._own_characters(destination).append(character)
+        self.touch(source)
+        self.touch(destination)
+
+    def exit_target(self, location, direction):
+        """Return where an exit leads, or -1 if there is no such exit."""
+        if self.exit_overrides:
+            target = self.exit_overrides.get((location, direction))
+            if target is not None:
+                return target
+        return self.world.exits[direction][location]
+
+    def exits_at(self, location):
+        """Return the direction indexes that currently lead out of a location."""
+        exits = self.world.locations[location].exits
+        if not self.exit_overrides:
+            return exits
+        directions = [direction for direction in exits if self.exit_target(location, direction) >= 0]
+        directions += [direction for (source, direction), target in self.exit_overrides.items()
+                       if source == location and target >= 0 and direction not in exits]
+        return directions
+
+    def set_exit(self, location, direction, target):
+        """Open, redirect or (with a target of -1) close the exit from a location in a direction."""
+        old = self.exit_target(location, direction)
+        if target == old:
+            return
+        router = self._own_router()
+
+        if self.remember('exit_overrides', None, self.exit_overrides):
+            self.exit_overrides = dict(self.exit_overrides)
+            self.copied += len(self.exit_overrides)
+        exit_overrides = router.overrides = self.exit_overrides
+        if target == self.world.exits[direction][location]:
+            del exit_overrides[(location, direction)]
+        else:
+            exit_overrides[(location, direction)] = target
+        router.exit_changed(location, direction, old, target)
+        self.touch(location)
+
+    def _own_router(self):
+        """Return this session's own Router, building it from the world's for the exits changed so far."""
+        if self.router is None:
+            exits = self.world.exits
+            self.router = self.world.router().copy(self.exit_overrides)
+            for (location, direction), target in self.exit_overrides.items():
+                self.router.exit_changed(location, direction, exits[direction][location], target)
+        return self.router
+
+    def route(self, source, target):
+        """Return the direction indexes of a shortest walk between two locations, or None."""
+        router = self._own_router() if self.exit_overrides else self.world.router()
+        return router.route(source, target)
+
+    def is_visible(self, item):
+        """Return True if an item is currently visible."""
+        visible = self.item_visibility.get(item)
+        if visible is None:
+            return self.world.items[item].visible
+        return visible
+
+    def set_visible(self, item, visible):
+        """Show or hide an item."""
+        if self.is_visible(item) != visible:
+            self.remember('item_visibility', item, self.item_visibility.get(item))
+            self.item_visibility[item] = visible
+            self.touch_all()
+
+    def item_property(self, item, name, default=None):
+        """Return the current value of one of an item's properties."""
+        properties = self.item_properties.get(item)
+        if properties is not None and name in properties:
+            return properties[name]
+        return self.world.items[item].properties.get(name, default)
+
+    def set_item_property(self, item, name, value):
+        """Change one of an item's properties for this session."""
+        properties = self.item_properties.get(item)
+        if self.remember('item_properties', item, properties) or properties is None:
+            properties = self.item_properties[item] = dict(properties or ())
+            self.copied += len(properties)
+        properties[name] = value
+
+    def mark_fired(self, trigger):
+        """Record that a once-only trigger has fired."""
+        if self.remember('fired', None, self.fired):
+            self.fired = set(self.fired)
+            self.copied += len(self.fired)
+        self.fired.add(trigger)
+
+
+class PlayerState:
+    """The player's own state: location, inventory, counters and visits.
+
+    The weight of everything carried is kept as a running total, updated
+    as items are picked up and put down. max_weight is None when the
+    player may carry any weight.
+    """
+
+    __slots__ = ('current_location', 'inventory', 'max_inventory', 'carried_weight', 'max_weight',
+                 'stats', 'visited', 'visited_shared')
+
+    def __init__(self, world):
+        self.current_location = world.start_location
+        self.inventory = ItemSet.fromkeys(world.start_inventory)
+        self.max_inventory = world.max_inventory
+        self.carried_weight = world.start_weight
+        self.max_weight = world.max_weight
+        self.stats = dict(world.start_stats)
+        self.visited = set()
+        self.visited_shared = False  # Whether a copy shares visited, so it must be copied before it grows
+
+    def copy(self):
+        """Return an independent copy of the player's state, sharing the rooms visited until either adds one."""
+        player = PlayerState.__new__(PlayerState)
+        player.current_location = self.current_location
+        player.inventory = ItemSet(self.inventory)
+        player.max_inventory = self.max_inventory
+        player.carried_weight = self.carried_weight
+        player.max_weight = self.max_weight
+        player.stats = dict(self.stats)
+        player.visited = self.visited
+        player.visited_shared = self.visited_shared = True
+        return player
+
+    def can_carry(self, weight):
+        """Return True if an item of this weight fits under the weight limit."""
+        return self.max_weight is None or self.carried_weight + weight <= self.max_weight
+
+    def carry(self, item, weight):
+        """Add an item of the given weight to the inventory."""
+        self.inventory.add(item)
+        self.carried_weight += weight
+
+    def put_down(self, item, weight):
+        """Remove an item of the given weight from the inventory."""
+        self.inventory.remove(item)
+        self.carried_weight -= weight
+
+    def is_first_visit(self, location, world):
+        """Return True if the player has not been to a location yet."""
+        return location not in self.visited and world.locations[location].first_visit
+
+    def visit(self, location):
+        """Record that the player has been to a location."""
+        if self.visited_shared:
+            self.visited = set(self.visited)
+            self.visited_shared = False
+        self.visited.add(location)
@@ -0,0 +1,111 @@
+# Grue Text Adventure Engine - Compressed Text Store
+#
+# Keeps a world's prose (descriptions and dialogue) compressed and decodes
+# an entry only when it is read. Entries are short, so each one is
+# deflated on its own against a preset dictionary trained on the world's
+# own text: the words and phrases the world keeps repeating cost a few
+# bits per use instead of their full length. The most recently read
+# entries are kept decoded, so rooms players keep returning to cost one
+# dictionary lookup.
+
+import functools
+import zlib
+from array import array
+from collections import Counter
+
+# Bytes of preset dictionary, the most deflate can refer back to
+DICTIONARY_SIZE = 32768
+
+# Texts sampled when training a dictionary
+TRAINING_SAMPLE = 5000
+
+# Longest run of words counted as one phrase when training
+PHRASE_WORDS = 4
+
+# Decoded entries kept per store
+TEXT_CACHE_SIZE = 1024
+
+
+def train_dictionary(texts, size=DICTIONARY_SIZE):
+    """Return a preset dictionary of the phrases most worth sharing among texts.
+
+    Phrases of up to PHRASE_WORDS words are scored by the bytes they would
+    save across a sample of the texts. The best phrases go at the end of
+    the dictionary, where deflate reaches them with the shortest distances.
+    """
+    step = max(1, len(texts) // TRAINING_SAMPLE)
+    counts = Counter()
+    for text in texts[::step]:
+        words = text.split()
+        for length in range(1, PHRASE_WORDS + 1):
+            for start in range(len(words) - length + 1):
+                counts[" ".join(words[start:start + length])] += 1
+
+    chosen = []
+    total = 0
+    scored = sorted(counts.items(), key=lambda entry: (entry[1] - 1) * len(entry[0]), reverse=True)
+    for phrase, count in scored:
+        if count < 2 or total >= size:
+            break
+        chosen.append(phrase)
+        total += len(phrase.encode("utf-8")) + 1
+    chosen.reverse()
+    return " ".join(chosen).encode("utf-8")[-size:]
+
+
+def compress_texts(texts, dictionary):
+    """Compress each text against a dictionary, returning (offsets, blob) for a TextStore."""
+    offsets = array('q', [0])
+    blob = bytearray()
+    for text in texts:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=dictionary)
+        blob += compressor.compress(text.encode("utf-8"))
+        blob += compressor.flush()
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+class TextStore:
+    """Texts compressed by compress_texts, decoded one at a time as they are read.
+
+    The dictionary, offsets and blob may be views of a memory-mapped file.
+    """
+
+    def __init__(self, dictionary, offsets, blob, cache_size=TEXT_CACHE_SIZE):
+        self.dictionary = bytes(dictionary)
+        self.offsets = offsets
+        self.blob = blob
+        self.get = functools.lru_cache(cache_size)(self._decode)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _decode(self, index):
+        """Return the text stored at an index."""
+        decompressor = zlib.decompressobj(-15, zdict=self.dictionary)
+        raw = decompressor.decompress(self.blob[self.offsets[index]:self.offsets[index + 1]])
+        return (raw + decompressor.flush()).decode("utf-8")
+
+
+class Prose:
+    """A record attribute held as an index into its world's TextStore and decoded when read.
+
+    The record needs a `texts` attribute holding the store and a slot
+    named by field for the index; decode turns the stored text into the
+    attribute's value (json.loads for a dialogue table, for example).
+    """
+
+    __slots__ = ('field', 'decode')
+
+    def __init__(self, field, decode=None):
+        self.field = field
+        self.decode = decode
+
+    def __get__(self, record, owner=None):
+        if record is None:
+            return self
+        text = record.texts.get(getattr(record, self.field))
+        return text if self.decode is None else self.decode(text)
+
+    def __set__(self, record, value):
+        setattr(record, self.field, value)
@@ -0,0 +1,203 @@
+# Grue Text Adventure Engine - Triggers
+#
+# Triggers make items and places react to the player. A game can list them
+# in an optional `triggers` table, and the engine derives the obvious ones
+# from item properties: a door with `locked` and `key_id` can be unlocked
+# and opened, a key that `opens` a door can be used on it, and anything
+# with a `fragrance` can be smelled.
+#
+# A trigger belongs either to a verb used on an item ("unlock door") or to
+# an event in a location: "enter", "leave", or a verb used on its own, such
+# as "pray". They are compiled once per world into indexes keyed by
+# (verb, item) and (location, event), so a command only looks at the
+# triggers that could fire, however many rules the world has.
+
+# Events every location can have triggers for, besides its own verbs
+EVENTS = ("enter", "leave")
+
+
+class Trigger:
+    """A compiled rule: conditions that must hold, and what happens when they do.
+
+    Items, locations and directions are held as indexes; everything a
+    trigger changes goes into the session's overlays.
+    """
+
+    __slots__ = ('index', 'location', 'requires', 'present', 'properties', 'stats', 'message', 'otherwise',
+                 'set_properties', 'set_stats', 'exits', 'show', 'hide', 'give', 'consume', 'once')
+
+    def holds(self, engine):
+        """Return True if the trigger can fire in the engine's current state."""
+        state, player = engine.state, engine.player
+        if self.once and self.index in state.fired:
+            return False
+        if self.location is not None and player.current_location != self.location:
+            return False
+        if any(item not in player.inventory for item in self.requires):
+            return False
+        items_here = state.items_at(player.current_location)
+        if any(item not in player.inventory and item not in items_here for item in self.present):
+            return False
+        if any(state.item_property(item, name) != value for item, name, value in self.properties):
+            return False
+        return all(player.stats.get(name) == value for name, value in self.stats)
+
+    def apply(self, engine):
+        """Carry out the trigger's effects."""
+        state, player, world = engine.state, engine.player, engine.world
+        if self.once:
+            state.mark_fired(self.index)
+        for item, name, value in self.set_properties:
+            state.set_item_property(item, name, value)
+        for name, value in self.set_stats:
+            player.stats[name] = value
+        for location, direction, target in self.exits:
+            state.set_exit(location, direction, target)
+        for item in self.show:
+            state.set_visible(item, True)
+        for item in self.hide:
+            state.set_visible(item, False)
+
+        location = player.current_location
+        for item in self.give:
+            if item not in player.inventory:
+                if item in state.items_at(location):
+                    state.remove_item(location, item)
+                player.carry(item, world.items[item].weight)
+        for item in self.consume:
+            if item in player.inventory:
+                player.put_down(item, world.items[item].weight)
+
+
+class TriggerIndex:
+    """Every trigger of a world, indexed by what can set it off.
+
+    verbs maps each verb the triggers use to whether it is used on an item;
+    bare_verbs holds those that are also used on their own in a location.
+    """
+
+    def __init__(self):
+        self.triggers = []
+        self.by_item = {}
+        self.by_location = {}
+        self.verbs = {}
+        self.bare_verbs = set()
+
+    def for_item(self, verb, item):
+        """Return the triggers for a verb used on an item, in the order they are tried."""
+        return self.by_item.get((verb, item), ())
+
+    def for_location(self, location, event):
+        """Return the triggers for an event, or a verb used on its own, in a location."""
+        return self.by_location.get((location, event), ())
+
+    def fire(self, engine, triggers, refuse=False):
+        """Run the first of the triggers whose conditions hold and return its message.
+
+        If none can fire, returns the first refusal message among them, or
+        None if they have none. With refuse, a refusal also marks the
+        engine's command as failed.
+        """
+        otherwise = None
+        for trigger in triggers:
+            if trigger.holds(engine):
+                trigger.apply(engine)
+                return trigger.message
+            if otherwise is None:
+                otherwise = trigger.otherwise
+        if refuse and otherwise is not None:
+            return engine.refuse(otherwise)
+        return otherwise
+
+
+def _lookup(index, id_, kind, rule):
+    """Return the index for an ID a trigger refers to."""
+    value = index.get(id_)
+    if value is None:
+        raise ValueError(f"Trigger {rule} refers to unknown {kind} '{id_}'")
+    return value
+
+
+def derived_rules(items):
+    """Return the trigger rules implied by the properties of a game's items."""
+    rules = []
+    for item_id, data in items.items():
+        name = data['name']
+        properties = data['properties']
+
+        if 'locked' in properties and 'key_id' in properties:
+            key = properties['key_id']
+            key_name = items[key]['name'] if key in items else key
+            rules += [
+                {"verb": "unlock", "item": item_id, "properties": {item_id: {"locked": False}},
+                 "message": f"The {name} is already unlocked."},
+                {"verb": "unlock", "item": item_id, "requires": [key],
+                 "properties": {item_id: {"locked": True}}, "set_properties": {item_id: {"locked": False}},
+                 "message": f"You unlock the {name} with the {key_name}.",
+                 "otherwise": f"You need the {key_name} to unlock the {name}."},
+                {"verb": "open", "item": item_id, "properties": {item_id: {"locked": False}},
+                 "message": f"You open the {name}.", "otherwise": f"The {name} is locked."},
+            ]
+
+        if 'opens' in properties:
+            door = properties['opens']
+            door_name = items[door]['name'] if door in items else door
+            rules.append({"verb": "use", "item": item_id, "present": [door],
+                          "properties": {door: {"locked": True}}, "set_properties": {door: {"locked": False}},
+                          "message": f"You use the {name} to unlock the {door_name}.",
+                          "otherwise": f"There is nothing here to use the {name} on."})
+
+        if 'fragrance' in properties:
+            rules.append({"verb": "smell", "item": item_id,
+                          "message": f"The {name} smells {properties['fragrance']}."})
+    return rules
+
+
+def compile_triggers(world, rules):
+    """Compile trigger rules against a world's IDs and return their TriggerIndex."""
+    index = TriggerIndex()
+    items = world.item_index
+    locations = world.location_index
+    for number, rule in enumerate(rules):
+        trigger = Trigger()
+        trigger.index = number
+        location = rule.get('location')
+        trigger.location = None if location is None else _lookup(locations, location, 'location', number)
+        trigger.requires = tuple(_lookup(items, item, 'item', number) for item in rule.get('requires', ()))
+        trigger.present = tuple(_lookup(items, item, 'item', number) for item in rule.get('present', ()))
+        trigger.properties = tuple((_lookup(items, item, 'item', number), name, value)
+                                   for item, values in rule.get('properties', {}).items()
+                                   for name, value in values.items())
+        trigger.stats = tuple(rule.get('stats', {}).items())
+        trigger.message = rule.get('message', "")
+        trigger.otherwise = rule.get('otherwise')
+
+        trigger.set_properties = tuple((_lookup(items, item, 'item', number), name, value)
+                                       for item, values in rule.get('set_properties', {}).items()
+                                       for name, value in values.items())
+        trigger.set_stats = tuple(rule.get('set_stats', {}).items())
+        trigger.exits = tuple((_lookup(locations, source, 'location', number), world._intern_direction(direction),
+                               -1 if target is None else _lookup(locations, target, 'location', number))
+                              for source, direction, target in rule.get('exits', ()))
+        trigger.show = tuple(_lookup(items, item, 'item', number) for item in rule.get('show', ()))
+        trigger.hide = tuple(_lookup(items, item, 'item', number) for item in rule.get('hide', ()))
+        trigger.give = tuple(_lookup(items, item, 'item', number) for item in rule.get('give', ()))
+        trigger.consume = tuple(_lookup(items, item, 'item', number) for item in rule.get('consume', ()))
+        trigger.once = rule.get('once', False)
+
+        if 'item' in rule:
+            verb = rule['verb']
+            key = (verb, _lookup(items, rule['item'], 'item', number))
+            index.by_item[key] = index.by_item.get(key, ()) + (trigger,)
+            index.verbs[verb] = True
+        else:
+            event = rule.get('event', rule.get('verb'))
+            if trigger.location is None or event is None:
+                raise ValueError(f"Trigger {number} needs an item, or a location and an event")
+            key = (trigger.location, event)
+            index.by_location[key] = index.by_location.get(key, ()) + (trigger,)
+            if event not in EVENTS:
+                index.verbs.setdefault(event, False)
+                index.bare_verbs.add(event)
+        index.triggers.append(trigger)
+    return index
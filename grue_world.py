@@ -0,0 +1,348 @@
+# Grue Text Adventure Engine - Shared World Definitions
+
+import hashlib
+from array import array
+from collections import OrderedDict
+
+from grue_npcs import compile_behaviours
+from grue_routing import Router
+from grue_triggers import compile_triggers, derived_rules
+
+# Rendered descriptions of unchanged locations kept per world
+RENDER_CACHE_SIZE = 4096
+
+
+class Location:
+    """A compiled location record."""
+
+    __slots__ = ('index', 'id', 'name', 'description', 'exits', 'items', 'characters', 'first_visit')
+
+    def __init__(self, index, location_id, name, description, exits, items, characters, first_visit):
+        self.index = index
+        self.id = location_id
+        self.name = name
+        self.description = description
+        self.exits = exits              # Direction indexes, in the order the game declares them
+        self.items = items              # Item indexes present at the start of the game, as dict keys in order
+        self.characters = characters    # Character indexes
+        self.first_visit = first_visit
+
+
+class Item:
+    """A compiled item record."""
+
+    __slots__ = ('index', 'id', 'name', 'description', 'portable', 'visible', 'actions', 'properties')
+
+    def __init__(self, index, item_id, name, description, portable, visible, actions, properties):
+        self.index = index
+        self.id = item_id
+        self.name = name
+        self.description = description
+        self.portable = portable
+        self.visible = visible
+        self.actions = actions
+        self.properties = properties
+
+    @property
+    def weight(self):
+        """The item's weight, from its properties; 0 if it has none."""
+        return self.properties.get('weight', 0)
+
+
+class Character:
+    """A compiled character record."""
+
+    __slots__ = ('index', 'id', 'name', 'description', 'friendly', 'dialogue', 'inventory', 'properties')
+
+    def __init__(self, index, character_id, name, description, friendly, dialogue, inventory, properties):
+        self.index = index
+        self.id = character_id
+        self.name = name
+        self.description = description
+        self.friendly = friendly
+        self.dialogue = dialogue
+        self.inventory = inventory
+        self.properties = properties
+
+
+class NameIndex:
+    """Lookup tables from lowercased names, words and word prefixes to record indexes.
+
+    Built once per World, so resolving what the player typed costs a few
+    dictionary lookups plus a membership test per candidate, however large
+    the catalogue or the room is.
+    """
+
+    # Posting lists longer than this are stored as frozensets for O(1) membership
+    SET_THRESHOLD = 8
+
+    def __init__(self, records):
+        exact = {}
+        prefixes = {}
+        for record in records:
+            name = record.name.lower()
+            for key in {name, record.id.lower()}:
+                exact.setdefault(key, []).append(record.index)
+            for word in set(name.split()):
+                for end in range(1, len(word) + 1):
+                    prefixes.setdefault(word[:end], []).append(record.index)
+
+        self.exact = {key: tuple(indexes) for key, indexes in exact.items()}
+        self.prefixes = {key: self._freeze(indexes) for key, indexes in prefixes.items()}
+
+    def _freeze(self, indexes):
+        if len(indexes) > self.SET_THRESHOLD:
+            return frozenset(indexes)
+        return tuple(indexes)
+
+    def _partial(self, tokens):
+        """Return one posting list per token, or None if any token matches nothing."""
+        postings = []
+        for token in tokens:
+            posting = self.prefixes.get(token)
+            if posting is None:
+                return None
+            postings.append(posting)
+        return postings
+
+    def find(self, text, *scopes):
+        """Return the first record in the given scopes matching text, or None.
+
+        Scopes are searched in order. Within each scope an exact name (or ID)
+        match wins over a record whose words start with every typed word.
+        """
+        text = text.strip().lower()
+        tokens = text.split()
+        if not tokens:
+            return None
+
+        exact = self.exact.get(text, ())
+        postings = self._partial(tokens)
+        if postings is not None:
+            postings.sort(key=len)
+        for scope in scopes:
+            if exact:
+                index = _first_in_scope(scope, exact, ())
+                if index is not None:
+                    return index
+            if postings is not None:
+                index = _first_in_scope(scope, postings[0], postings[1:])
+                if index is not None:
+                    return index
+        return None
+
+    def find_any(self, text):
+        """Return the lowest-numbered record anywhere in the world matching text, or None."""
+        text = text.strip().lower()
+        tokens = text.split()
+        if not tokens:
+            return None
+
+        exact = self.exact.get(text)
+        if exact:
+            return exact[0]
+
+        postings = self._partial(tokens)
+        if postings is None:
+            return None
+        postings.sort(key=len)
+        matches = set(postings[0]).intersection(*postings[1:])
+        return min(matches) if matches else None
+
+
+def _first_in_scope(scope, candidates, postings):
+    """Return the first index in a scope that is a candidate and in every posting list, or None.
+
+    Scopes with O(1) membership, such as a room's items, are probed with
+    each candidate when there are fewer candidates than records in scope;
+    the scope is only walked in order to choose between several matches.
+    """
+    if isinstance(scope, (dict, set, frozenset)) and len(candidates) < len(scope):
+        matches = [index for index in candidates
+                   if index in scope and all(index in posting for posting in postings)]
+        if len(matches) <= 1:
+            return matches[0] if matches else None
+        candidates, postings = frozenset(matches), ()
+    for index in scope:
+        if index in candidates and all(index in posting for posting in postings):
+            return index
+    return None
+
+
+def _intern_ids(table):
+    """Return the IDs of a game table and a mapping from each ID to its index."""
+    ids = list(table)
+    return ids, {id_: index for index, id_ in enumerate(ids)}
+
+
+def _resolve(index, id_, kind, owner):
+    """Look up the integer index for an ID referenced by another record."""
+    try:
+        return index[id_]
+    except KeyError:
+        raise ValueError(f"Unknown {kind} '{id_}' referenced by '{owner}'") from None
+
+
+class RenderCache:
+    """Least-recently-used cache of rendered location text, keyed by location index.
+
+    Entries are (version, text) pairs; an entry only counts as a hit when its
+    version matches the one asked for.
+    """
+
+    __slots__ = ('capacity', 'entries')
+
+    def __init__(self, capacity=RENDER_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def get(self, location, version):
+        """Return the cached text for a location at a version, or None."""
+        entry = self.entries.get(location)
+        if entry is None or entry[0] != version:
+            return None
+        self.entries.move_to_end(location)
+        return entry[1]
+
+    def put(self, location, version, text):
+        """Store the text rendered for a location at a version."""
+        self.entries[location] = (version, text)
+        self.entries.move_to_end(location)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+class World:
+    """Read-only world compiled from a game module.
+
+    A World is loaded once per game module and shared by every session
+    playing that game. Sessions never modify it; their changes are kept
+    in the overlays from grue_state instead.
+
+    Every location, item, character and direction ID is interned to a
+    small integer, records are stored in lists indexed by those integers,
+    and exits are held in one array per direction mapping a location
+    index to its destination (or -1 when there is no exit that way).
+    """
+
+    def __init__(self, game_module):
+        self.module = game_module
+        self.game_info = game_module.game_info
+
+        self.location_ids, self.location_index = _intern_ids(game_module.locations)
+        self.item_ids, self.item_index = _intern_ids(game_module.items)
+        self.character_ids, self.character_index = _intern_ids(game_module.characters)
+        self.directions = []
+        self.direction_index = {}
+        self.exits = []
+
+        self.items = [self._compile_item(index, item_id, data)
+                      for index, (item_id, data) in enumerate(game_module.items.items())]
+        self.characters = [self._compile_character(index, char_id, data)
+                           for index, (char_id, data) in enumerate(game_module.characters.items())]
+        self.locations = [self._compile_location(index, location_id, data)
+                          for index, (location_id, data) in enumerate(game_module.locations.items())]
+
+        # Name lookup tables for resolving what the player types
+        self.item_names = NameIndex(self.items)
+        self.character_names = NameIndex(self.characters)
+        self.location_names = NameIndex(self.locations)
+
+        # Player starting state
+        player = game_module.player
+        self.start_location = _resolve(self.location_index, player['current_location'], 'location', 'player')
+        self.start_inventory = tuple(_resolve(self.item_index, item_id, 'item', 'player')
+                                     for item_id in player['inventory'])
+        self.max_inventory = player['max_inventory']
+        self.max_weight = player.get('max_weight')
+        self.start_weight = sum(self.items[item].weight for item in self.start_inventory)
+        self.start_stats = player['stats']
+
+        # The game's own triggers, then those implied by item properties, which they take precedence over
+        self.trigger_rules = list(getattr(game_module, 'triggers', [])) + derived_rules(game_module.items)
+        self.triggers = compile_triggers(self, self.trigger_rules)
+
+        # Characters that move on their own
+        self.behaviours = compile_behaviours(self, game_module.characters)
+
+        # Text of locations no session has changed, shared by every session
+        self.rendered = RenderCache()
+        self._router = None
+        self._fingerprint = None
+
+    def _intern_direction(self, direction):
+        """Return the index for a direction name, adding a new exit array if needed."""
+        index = self.direction_index.get(direction)
+        if index is None:
+            index = len(self.directions)
+            self.directions.append(direction)
+            self.direction_index[direction] = index
+            self.exits.append(array('i', [-1]) * len(self.location_ids))
+        return index
+
+    def _compile_location(self, index, location_id, data):
+        exits = []
+        for direction, target in data['exits'].items():
+            direction_index = self._intern_direction(direction)
+            self.exits[direction_index][index] = _resolve(self.location_index, target, 'location', location_id)
+            exits.append(direction_index)
+
+        return Location(
+            index, location_id, data['name'], data['description'], tuple(exits),
+            dict.fromkeys(_resolve(self.item_index, item_id, 'item', location_id) for item_id in data['items']),
+            tuple(_resolve(self.character_index, char_id, 'character', location_id)
+                  for char_id in data['characters']),
+            data['first_visit'])
+
+    def _compile_item(self, index, item_id, data):
+        return Item(index, item_id, data['name'], data['description'], data['portable'],
+                    data['visible'], tuple(data['actions']), data['properties'])
+
+    def _compile_character(self, index, char_id, data):
+        return Character(
+            index, char_id, data['name'], data['description'], data['friendly'], data['dialogue'],
+            tuple(_resolve(self.item_index, item_id, 'item', char_id) for item_id in data['inventory']),
+            data['properties'])
+
+    def exit_target(self, location_index, direction_index):
+        """Return the location an exit leads to, or -1 if there is no such exit."""
+        return self.exits[direction_index][location_index]
+
+    def router(self):
+        """Return the Router over the world's own exits, shared by every session."""
+        if self._router is None:
+            self._router = Router(self)
+        return self._router
+
+    def fingerprint(self):
+        """Return a short hash of the world's IDs, used to check saved state still fits it."""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=8)
+            for ids in (self.location_ids, self.item_ids, self.character_ids):
+                digest.update("\0".join(ids).encode("utf-8"))
+                digest.update(b"\1")
+            self._fingerprint = digest.digest()
+        return self._fingerprint
+
+
+# Worlds that have already been loaded, keyed by game module
+_worlds = {}
+
+
+def load_world(game_module):
+    """Return the shared World for a game, building it on first use.
+
+    The game may be a game module, the path of a JSON data file, or an
+    already loaded World.
+    """
+    if isinstance(game_module, World):
+        return game_module
+    if isinstance(game_module, str):
+        from grue_datafile import load_data_world
+        return load_data_world(game_module)
+
+    world = _worlds.get(game_module)
+    if world is None:
+        world = World(game_module)
+        _worlds[game_module] = world
+    return world
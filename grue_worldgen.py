@@ -0,0 +1,183 @@
+# Grue Text Adventure Engine - Synthetic World Generator
+#
+# Builds game worlds of any size in the same format as crystalia_manor.py,
+# either as an in-memory module (for benchmarks), a module file or a JSON
+# data file (see grue_datafile), depending on the output's extension:
+#
+#     python grue_worldgen.py games/generated_world.py --rooms 1000 --items-per-room 2 --characters 50
+#     python grue_worldgen.py games/huge_world.json --rooms 1000000
+
+import argparse
+import json
+import random
+import types
+
+ADJECTIVES = ["Old", "Rusty", "Shiny", "Broken", "Heavy", "Tiny", "Ancient", "Golden",
+              "Silver", "Cracked", "Dusty", "Glowing", "Wooden", "Iron", "Velvet", "Bone"]
+NOUNS = ["Key", "Sword", "Lamp", "Book", "Coin", "Ring", "Chain", "Torch",
+         "Map", "Bottle", "Shield", "Helmet", "Scroll", "Gem", "Rope", "Mirror"]
+ROOM_KINDS = ["Hall", "Cellar", "Chamber", "Corridor", "Garden", "Library", "Vault", "Tower",
+              "Kitchen", "Gallery", "Crypt", "Study", "Armoury", "Chapel", "Attic", "Cave"]
+CHARACTER_KINDS = ["Guard", "Merchant", "Ghost", "Hermit", "Rat", "Knight", "Witch", "Bard"]
+
+# Opposite directions, so every generated exit can be walked back
+OPPOSITE = {"north": "south", "south": "north", "east": "west", "west": "east"}
+
+
+def generate_game_data(rooms=100, items_per_room=1, characters=10, exit_density=0.5, seed=0):
+    """Return the locations, items, characters, player and game_info of a new world.
+
+    Rooms are laid out on a square grid. Every room is linked to its east and
+    west neighbours and the first column is linked north to south, so the
+    whole world is connected; each remaining north/south link exists with
+    probability exit_density. All exits work in both directions.
+    """
+    rng = random.Random(seed)
+    width = max(1, int(rooms ** 0.5))
+    location_ids = ["start"] + [f"room_{i}" for i in range(1, rooms)]
+
+    locations = {}
+    for i, location_id in enumerate(location_ids):
+        row, column = divmod(i, width)
+        kind = ROOM_KINDS[i % len(ROOM_KINDS)]
+        locations[location_id] = {
+            "name": f"{kind} {row}-{column}",
+            "description": f"You are in a {kind.lower()} deep inside the generated world.",
+            "exits": {},
+            "items": [],
+            "characters": [],
+            "first_visit": True
+        }
+
+    def link(a, b, direction):
+        locations[location_ids[a]]["exits"][direction] = location_ids[b]
+        locations[location_ids[b]]["exits"][OPPOSITE[direction]] = location_ids[a]
+
+    for i in range(rooms):
+        row, column = divmod(i, width)
+        if column + 1 < width and i + 1 < rooms:
+            link(i, i + 1, "east")
+        if i + width < rooms and (column == 0 or rng.random() < exit_density):
+            link(i, i + width, "south")
+
+    items = {}
+    for i in range(rooms * items_per_room):
+        item_id = f"item_{i}"
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        items[item_id] = {
+            "name": name,
+            "description": f"A {name.lower()}. Nothing about it seems unusual.",
+            "portable": True,
+            "visible": True,
+            "actions": ["take", "drop", "examine"],
+            "properties": {
+                "weight": rng.randint(1, 5)
+            }
+        }
+        locations[location_ids[i // items_per_room]]["items"].append(item_id)
+
+    characters_table = {}
+    for i in range(characters):
+        char_id = f"character_{i}"
+        kind = CHARACTER_KINDS[i % len(CHARACTER_KINDS)]
+        characters_table[char_id] = {
+            "name": f"{kind} {i}",
+            "description": f"A {kind.lower()} who has wandered far from home.",
+            "friendly": rng.random() < 0.8,
+            "dialogue": {
+                "greeting": f"Hello, traveller. I am {kind} {i}."
+            },
+            "inventory": [],
+            "properties": {}
+        }
+        # The first character always waits at the start so benchmarks can talk to it
+        location_id = "start" if i == 0 else rng.choice(location_ids)
+        locations[location_id]["characters"].append(char_id)
+
+    player = {
+        "current_location": "start",
+        "inventory": [],
+        "max_inventory": 10,
+        "stats": {
+            "moves": 0
+        }
+    }
+
+    game_info = {
+        "title": f"Generated World ({rooms} rooms)",
+        "intro_text": "Welcome to a generated world.\n\nType 'help' at any time to see available commands.\n",
+        "author": "grue_worldgen",
+        "version": "0.1"
+    }
+
+    return {"locations": locations, "items": items, "characters": characters_table,
+            "player": player, "game_info": game_info}
+
+
+def generate_game(rooms=100, items_per_room=1, characters=10, exit_density=0.5, seed=0):
+    """Return a new in-memory game module that can be passed to GrueEngine.load_game."""
+    module = types.ModuleType(f"generated_{rooms}")
+    for name, value in generate_game_data(rooms, items_per_room, characters, exit_density, seed).items():
+        setattr(module, name, value)
+    return module
+
+
+def _literal(value, indent):
+    """Format a value as Python source in the layout the shipped game modules use."""
+    pad = "    " * indent
+    inner = "    " * (indent + 1)
+    if isinstance(value, bool) or value is None:
+        return repr(value)
+    if isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(_literal(v, indent) for v in value) + "]"
+    if not value:
+        return "{}"
+    entries = [f"{inner}{json.dumps(k)}: {_literal(v, indent + 1)}" for k, v in value.items()]
+    return "{\n" + ",\n".join(entries) + "\n" + pad + "}"
+
+
+def write_game_module(path, data):
+    """Write game data to path as a game module."""
+    sections = [
+        ("locations", "Dictionary of all locations"),
+        ("items", "Dictionary of all items"),
+        ("characters", "Dictionary of all characters"),
+        ("player", "Player starting state"),
+        ("game_info", "Game metadata"),
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# {data['game_info']['title']} - Game Module for Grue Text Adventure Engine\n")
+        for name, comment in sections:
+            f.write(f"\n# {comment}\n{name} = {_literal(data[name], 0)}\n")
+
+
+def write_game_data(path, data):
+    """Write game data to path as a JSON data file."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Grue game module.")
+    parser.add_argument("output", help="path of the module (.py) or data file (.json) to write")
+    parser.add_argument("--rooms", type=int, default=100, help="number of rooms (default: 100)")
+    parser.add_argument("--items-per-room", type=int, default=1, help="items placed in each room (default: 1)")
+    parser.add_argument("--characters", type=int, default=10, help="number of characters (default: 10)")
+    parser.add_argument("--exit-density", type=float, default=0.5,
+                        help="chance of each optional north/south exit existing (default: 0.5)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    args = parser.parse_args()
+
+    data = generate_game_data(args.rooms, args.items_per_room, args.characters, args.exit_density, args.seed)
+    if args.output.endswith(".json"):
+        write_game_data(args.output, data)
+    else:
+        write_game_module(args.output, data)
+
+
+if __name__ == "__main__":
+    main()
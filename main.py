@@ -1,23 +1,16 @@
 # Import the game engine
 from grue_engine import GrueEngine
+from grue_history import History
 
-# Direct imports of game modules
-import crystalia_manor
-import dark_dungeon
+# Games are found in the games directory and only imported once selected
+from grue_registry import GameRegistry
 
-# Dictionary mapping game IDs to modules
-GAMES = {
-    "crystalia_manor": crystalia_manor,
-    "dark_dungeon": dark_dungeon
-}
+REGISTRY = GameRegistry()
 
 
 def display_game_menu():
     """Display a menu of available games."""
-    game_selection = [
-        {"id": "crystalia_manor", "title": "Crystalia Manor", "description": "Explore a mysterious abandoned mansion"},
-        {"id": "dark_dungeon", "title": "Dark Dungeon", "description": "Escape from a dangerous underground prison"}
-    ]
+    game_selection = REGISTRY.games()
 
     print("\nGrue - Text Adventure Engine")
     print("=========================")
@@ -59,11 +52,12 @@ def main():
             break
 
         # Load the selected game module
-        game_module = GAMES[selected_game_id]
+        game_module = REGISTRY.load(selected_game_id)
 
         # Create and run the game engine with the selected game
         engine = GrueEngine()
         engine.load_game(game_module)
+        History().attach(engine)
         engine.start_game()
 
         # After the game ends, we return to the menu